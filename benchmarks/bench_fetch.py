@@ -0,0 +1,240 @@
+"""
+End-to-end fetch benchmarks of "MISOClient.get_*_data" against the
+local MISO stand-in server (see "benchmarks/miso_server.py").
+
+    python -m benchmarks.bench_fetch --days 14 --latency 0.05
+
+Each benchmark runs "--repeat" times with a fresh client (the first
+run also generates the server's fixture files and is discarded).
+Reports wall time, rows and bytes per second, request latency
+percentiles (from "RequestTracer") and peak memory.
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import resource
+import statistics
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Optional
+
+import pandas as pd
+import pytz
+
+from benchmarks import common
+from benchmarks.miso_server import MISOServer, ServerConfig, serve, use_server
+from powerviz.miso import MISOClient, MISOMarketReport
+from powerviz.retry import RetryPolicy
+from powerviz.tracing import RequestTracer
+from powerviz.types import Dates, Nodes
+
+Benchmark = Callable[[MISOClient, Dates, Nodes], Awaitable[pd.DataFrame]]
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "load": lambda client, dates, _: client.get_load_data(dates),
+    "forecast": lambda client, dates, _: client.get_forecast_data(dates),
+    "fuel_mix": lambda client, dates, _: client.get_fuel_mix_data(dates),
+    "realtime_lmp": lambda client, dates, nodes: (
+        client.get_realtime_lmp_data(dates, nodes=nodes)
+    ),
+    "dayahead_lmp": lambda client, dates, nodes: (
+        client.get_dayahead_lmp_data(
+            dates, MISOMarketReport.DAYAHEAD_EXPOST_LMP, nodes=nodes
+        )
+    ),
+}
+
+
+async def run_benchmark(
+    server: MISOServer,
+    benchmark: Benchmark,
+    dates: Dates,
+    args: argparse.Namespace,
+) -> dict[str, float]:
+    tracer = RequestTracer()
+    retry_policy = RetryPolicy(
+        initial_wait=args.retry_wait, max_wait=args.retry_wait * 8
+    )
+
+    if args.memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    async with MISOClient(
+        concurrent_limit=args.concurrency,
+        adaptive_concurrency=args.adaptive,
+        retry_policy=retry_policy,
+        tracer=tracer,
+        parse_workers=args.parse_workers,
+    ) as client:
+        use_server(client, server.base_url)
+        df = await benchmark(client, dates, args.nodes)
+    wall = time.perf_counter() - start
+
+    peak = 0.0
+    if args.memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    traces_df = tracer.to_dataframe()
+    latencies = traces_df["total"]
+    return {
+        "wall": wall,
+        "rows": len(df),
+        "rows/s": len(df) / wall,
+        "requests": len(traces_df),
+        "retries": traces_df["retries"].sum(),
+        "MB/s": traces_df["bytes"].sum() / 2**20 / wall,
+        "p50": latencies.quantile(0.5),
+        "p95": latencies.quantile(0.95),
+        "p99": latencies.quantile(0.99),
+        "peak_mb": peak,
+    }
+
+
+def historical_dates(end: dt.date, days: int) -> list[dt.datetime]:
+    tz = pytz.timezone(MISOClient.TIMEZONE)
+    return [
+        tz.localize(dt.datetime.combine(end, dt.time())) - dt.timedelta(days=i)
+        for i in reversed(range(days))
+    ]
+
+
+async def main(args: argparse.Namespace) -> None:
+    config = ServerConfig(
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        not_found_rate=args.not_found_rate,
+        too_many_requests_rate=args.too_many_requests_rate,
+        retry_after=args.retry_after,
+        archived_before=args.archived_before,
+        extra_nodes=args.extra_nodes,
+    )
+
+    date_sets: dict[str, Dates] = {
+        "latest": "latest",
+        "today": "today",
+        f"{args.days}d": historical_dates(args.end, args.days),
+    }
+
+    results: list[dict[str, float | str]] = []
+    async with serve(config) as server:
+        for name in args.benchmarks:
+            for dates_name, dates in date_sets.items():
+                try:
+                    runs = [
+                        await run_benchmark(
+                            server, BENCHMARKS[name], dates, args
+                        )
+                        for _ in range(args.repeat)
+                    ]
+                except NotImplementedError:
+                    # e.g. no "today" fuel mix data
+                    continue
+
+                # discard warm up run (server fixture generation)
+                if len(runs) > 1:
+                    runs = runs[1:]
+
+                # report median run by wall time
+                runs.sort(key=lambda run: run["wall"])
+                result: dict[str, float | str] = {
+                    "benchmark": name,
+                    "dates": dates_name,
+                    **runs[len(runs) // 2],
+                    "wall_stdev": (
+                        statistics.stdev(run["wall"] for run in runs)
+                        if len(runs) > 1
+                        else 0.0
+                    ),
+                }
+                results.append(result)
+                print(
+                    f"{name:>13} {dates_name:>7}: "
+                    f"{result['wall']:.3f}s "
+                    f"({result['rows/s']:,.0f} rows/s)"
+                )
+
+        server_requests = sum(server.requests.values())
+
+    results_df = pd.DataFrame(results).set_index(["benchmark", "dates"])
+    common.report_results(results_df, args.output)
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(f"\nserver requests: {server_requests}")
+    print(f"process max rss: {max_rss:.1f} MB")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = common.make_parser(__doc__, BENCHMARKS)
+    parser.add_argument(
+        "--days", type=int, default=14, help="historical days to fetch"
+    )
+    parser.add_argument(
+        "--end",
+        type=dt.date.fromisoformat,
+        default=dt.date(2021, 1, 10),
+        help="last historical date (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--archived-before",
+        type=dt.date.fromisoformat,
+        default=dt.date(2021, 1, 1),
+        help="files before this date are only in monthly archives",
+    )
+    parser.add_argument(
+        "--extra-nodes",
+        type=int,
+        default=0,
+        help="synthetic nodes added to LMP data",
+    )
+    parser.add_argument(
+        "--nodes",
+        choices=["hubs", "all"],
+        default="hubs",
+        help="LMP nodes to parse",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="response latency (s)"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=None,
+        help="per response bandwidth (bytes/s)",
+    )
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--too-many-requests-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=None,
+        help='"Retry-After" seconds sent with 429s',
+    )
+    parser.add_argument(
+        "--retry-wait",
+        type=float,
+        default=0.05,
+        help="initial retry wait (s)",
+    )
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="parse processes (default: 0, parses inline)",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="trace peak python allocations (slows down runs)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+
+    return common.parse_args(parser, BENCHMARKS, argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,395 @@
+"""
+Parser micro-benchmarks of the "MISOClient.parse_*" methods on fixture
+files (see "benchmarks/fixtures.py"), with LMP reports scaled up to
+all-node sizes.
+
+    python -m benchmarks.bench_parse --extra-nodes 2300
+
+Each parser runs "--repeat" times on the same fixture (after a warm up
+run, fast parsers are timed in batches of calls taking "--min-time").
+Reports rows (and input MB) per second of the median run, peak traced
+allocations ("tracemalloc", separate run) and a per-stage breakdown
+(read, filter, localize, reshape, sort) of the median run, attributed
+from a profiled run ("cProfile") by the functions the parser calls.
+Row filtering done while reading a report counts as read.
+
+Generated fixtures are kept in "--fixture-dir" (large xlsx reports take
+a while to generate).
+
+Results can be stored as a baseline with "--save-baseline" and are
+compared against "--baseline" (default "benchmarks/baselines/
+bench_parse.json" if it exists): parsers slower (rows/s) or allocating
+more than "--tolerance" are flagged as regressions and the exit status
+is 1. Baselines are machine specific.
+"""
+
+import argparse
+import cProfile
+import dataclasses
+import datetime as dt
+import io
+import json
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+from benchmarks import common
+from benchmarks.fixtures import MISOFixtures
+from powerviz.base import json_loads
+from powerviz.miso import MISOClient, MISOMarketReport
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "baselines", "bench_parse.json"
+)
+
+MARKET_DATE = dt.date(2021, 1, 5)
+API_NOW = dt.datetime(2021, 1, 5, 17, 0, tzinfo=dt.timezone.utc)
+
+
+@dataclasses.dataclass(frozen=True)
+class ParserBenchmark:
+    parser: str  # "MISOClient" method
+    fixture: Callable[[MISOFixtures], bytes]
+    # raw fixture -> parser input (decoding counts as read)
+    decode: Callable[[bytes], Any]
+    lmp: bool = False  # takes "nodes"
+
+
+BENCHMARKS: dict[str, ParserBenchmark] = {
+    "load_report": ParserBenchmark(
+        "parse_forecast_and_load_market_report",
+        lambda fixtures: fixtures.market_report(
+            MISOMarketReport.FORECAST_AND_LOAD, MARKET_DATE
+        ),
+        io.BytesIO,
+    ),
+    "fuel_mix_report": ParserBenchmark(
+        "parse_generation_fuel_mix_market_report",
+        lambda fixtures: fixtures.market_report(
+            MISOMarketReport.GENERATION_FUEL_MIX, MARKET_DATE
+        ),
+        io.BytesIO,
+    ),
+    "realtime_lmp_report": ParserBenchmark(
+        "parse_realtime_exante_lmp_market_report",
+        lambda fixtures: fixtures.market_report(
+            MISOMarketReport.REALTIME_EXANTE_LMP, MARKET_DATE
+        ),
+        io.BytesIO,
+        lmp=True,
+    ),
+    "dayahead_lmp_report": ParserBenchmark(
+        "parse_dayahead_lmp_market_report",
+        lambda fixtures: fixtures.market_report(
+            MISOMarketReport.DAYAHEAD_EXPOST_LMP, MARKET_DATE
+        ),
+        io.BytesIO,
+        lmp=True,
+    ),
+    "load_api": ParserBenchmark(
+        "parse_load_api_data",
+        lambda fixtures: fixtures.load_api_json(API_NOW),
+        json_loads,
+    ),
+    "forecast_api": ParserBenchmark(
+        "parse_forecast_api_data",
+        lambda fixtures: fixtures.load_api_json(API_NOW),
+        json_loads,
+    ),
+    "fuel_mix_api": ParserBenchmark(
+        "parse_fuel_mix_api_data",
+        lambda fixtures: fixtures.fuel_mix_api_json(API_NOW),
+        json_loads,
+    ),
+    "realtime_lmp_api": ParserBenchmark(
+        "parse_realtime_expost_lmp_api_data",
+        lambda fixtures: fixtures.realtime_lmp_api_csv(API_NOW, latest=False),
+        bytes,
+        lmp=True,
+    ),
+}
+
+STAGES = ["read", "filter", "localize", "reshape", "sort", "other"]
+
+# stage of functions called by parsers (by name, first match), other
+# pandas/numpy and builtin calls are reshaping
+STAGE_PATTERNS: dict[str, tuple[str, ...]] = {
+    "sort": ("sort_values", "argsort", "lexsort"),
+    "localize": (
+        "to_native_tz",
+        "tz_localize",
+        "parse_api_refid_datetime",
+        "to_datetime",
+        "to_timedelta",
+    ),
+    "filter": ("node_mask", "node_filter"),
+    "read": (
+        "read_csv",
+        "read_excel",
+        "from_filelike",
+        "get_sheet",
+        "iter_rows",
+        "readline",
+        "json_loads",
+        "strptime",
+        "builtins.next",
+        "<listcomp>",
+    ),
+}
+
+
+def stage_of(func: tuple[str, int, str]) -> str:
+    filename, _, name = func
+    for stage, patterns in STAGE_PATTERNS.items():
+        if any(pattern in name for pattern in patterns):
+            return stage
+    if filename == "~" or any(
+        package in filename for package in ("pandas", "numpy")
+    ):
+        return "reshape"
+    return "other"
+
+
+def code_key(fn: Callable[..., Any]) -> tuple[str, int, str]:
+    code = getattr(fn, "__func__", fn).__code__
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def stage_times(
+    parse: Callable[[], pd.DataFrame], parser: Callable[..., Any]
+) -> dict[str, float]:
+    """
+    Profiled time of a single "parse" call by stage, from the calls
+    made directly by "parse" and "parser" (including nested calls).
+    """
+
+    profile = cProfile.Profile()
+    profile.runcall(parse)
+    stats: dict[Any, Any] = pstats.Stats(profile).stats  # type: ignore
+
+    roots = {code_key(parse), code_key(parser)}
+    times = dict.fromkeys(STAGES, 0.0)
+    for func, (_, _, tottime, _, callers) in stats.items():
+        if func in roots:
+            times["other"] += tottime
+            continue
+        for caller, (_, _, _, cumtime) in callers.items():
+            if caller in roots:
+                times[stage_of(func)] += cumtime
+    return times
+
+
+def load_fixture(
+    name: str, benchmark: ParserBenchmark, args: argparse.Namespace
+) -> bytes:
+    path = os.path.join(
+        args.fixture_dir,
+        f"{name}-{args.extra_nodes if benchmark.lmp else 0}.bin",
+    )
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    data = benchmark.fixture(MISOFixtures(extra_nodes=args.extra_nodes))
+    os.makedirs(args.fixture_dir, exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    return data
+
+
+def run_benchmark(
+    client: MISOClient,
+    benchmark: ParserBenchmark,
+    data: bytes,
+    nodes: Optional[str],
+    args: argparse.Namespace,
+) -> dict[str, float]:
+    parser = getattr(client, benchmark.parser)
+
+    def parse() -> pd.DataFrame:
+        if nodes is not None:
+            return parser(benchmark.decode(data), nodes=nodes)
+        return parser(benchmark.decode(data))
+
+    # warm up, small parsers are timed in batches of "number" calls
+    start = time.perf_counter()
+    rows = len(parse())
+    number = max(1, int(args.min_time / (time.perf_counter() - start)))
+
+    walls: list[float] = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            parse()
+        walls.append((time.perf_counter() - start) / number)
+    wall = statistics.median(walls)
+
+    tracemalloc.start()
+    current = tracemalloc.get_traced_memory()[0]
+    parse()
+    peak = (tracemalloc.get_traced_memory()[1] - current) / 2**20
+    tracemalloc.stop()
+
+    # profiled shares of the (unprofiled) median run
+    times = stage_times(parse, parser)
+    total = sum(times.values())
+    return {
+        "rows": rows,
+        "wall_ms": wall * 1000,
+        "rows/s": rows / wall,
+        "input_mb/s": len(data) / 2**20 / wall,
+        "peak_mb": peak,
+        **{
+            f"{stage}_ms": wall * 1000 * time_ / total
+            for stage, time_ in times.items()
+        },
+    }
+
+
+def find_regressions(
+    results_df: pd.DataFrame,
+    baseline: dict[str, Any],
+    args: argparse.Namespace,
+) -> list[str]:
+    if baseline.get("extra_nodes") != args.extra_nodes:
+        print(
+            "\nbaseline skipped, generated with "
+            f"--extra-nodes {baseline.get('extra_nodes')}"
+        )
+        return []
+
+    regressions: list[str] = []
+    for name, result in results_df.iterrows():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if result["rows/s"] < base["rows/s"] * (1 - args.tolerance):
+            regressions.append(
+                f"{name}: {result['rows/s']:,.0f} rows/s "
+                f"(baseline {base['rows/s']:,.0f})"
+            )
+        if result["peak_mb"] > base["peak_mb"] * (1 + args.tolerance):
+            regressions.append(
+                f"{name}: {result['peak_mb']:.2f} MB peak "
+                f"(baseline {base['peak_mb']:.2f})"
+            )
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    client = MISOClient(parse_workers=0)
+
+    results: dict[str, dict[str, float]] = {}
+    for name in args.benchmarks:
+        benchmark = BENCHMARKS[name]
+        data = load_fixture(name, benchmark, args)
+        for nodes in args.nodes if benchmark.lmp else [None]:
+            result_name = name if nodes is None else f"{name}[{nodes}]"
+            results[result_name] = run_benchmark(
+                client, benchmark, data, nodes, args
+            )
+            result = results[result_name]
+            print(
+                f"{result_name:>26}: {result['wall_ms']:.2f}ms "
+                f"({result['rows/s']:,.0f} rows/s, "
+                f"{len(data) / 2**20:.1f} MB input)"
+            )
+
+    results_df = pd.DataFrame.from_dict(results, orient="index")
+    common.report_results(results_df, args.output)
+
+    if args.save_baseline is not None:
+        os.makedirs(
+            os.path.dirname(os.path.abspath(args.save_baseline)),
+            exist_ok=True,
+        )
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "extra_nodes": args.extra_nodes,
+                    "results": {
+                        name: {
+                            "rows/s": result["rows/s"],
+                            "peak_mb": result["peak_mb"],
+                        }
+                        for name, result in results.items()
+                    },
+                },
+                file,
+                indent=2,
+            )
+            file.write("\n")
+        return 0
+
+    if args.baseline is None or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = find_regressions(results_df, baseline, args)
+    if len(regressions) > 0:
+        print(f"\nregressions (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"\nno regressions (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = common.make_parser(__doc__, BENCHMARKS)
+    parser.add_argument(
+        "--extra-nodes",
+        type=int,
+        default=2300,
+        help="synthetic nodes added to LMP fixtures (all-node size)",
+    )
+    parser.add_argument(
+        "--nodes",
+        nargs="+",
+        choices=["hubs", "all"],
+        default=["hubs", "all"],
+        help="LMP nodes to parse (each selection is a benchmark)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="minimum time (s) of each timed run (batches fast parsers)",
+    )
+    parser.add_argument(
+        "--fixture-dir",
+        default=os.path.join(tempfile.gettempdir(), "powerviz-bench-fixtures"),
+        help="directory of generated fixtures",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_PATH,
+        help="baseline to compare against",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        metavar="PATH",
+        help="store results as a baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="relative slowdown/allocation increase flagged",
+    )
+
+    return common.parse_args(parser, BENCHMARKS, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,71 @@
+"""
+Command line and result reporting helpers shared by the benchmark
+scripts.
+"""
+
+import argparse
+from typing import Iterable, Optional
+
+import pandas as pd
+
+
+def make_parser(
+    doc: str, benchmarks: Iterable[str]
+) -> argparse.ArgumentParser:
+    """
+    Argument parser described by the first paragraph of a benchmark
+    script's docstring "doc", selecting any of "benchmarks" (default
+    all).
+    """
+
+    benchmarks = list(benchmarks)
+    parser = argparse.ArgumentParser(
+        description=doc.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        default=benchmarks,
+        help=f"benchmarks to run, any of {benchmarks} (default: all)",
+    )
+    return parser
+
+
+def parse_args(
+    parser: argparse.ArgumentParser,
+    benchmarks: Iterable[str],
+    argv: Optional[list[str]] = None,
+) -> argparse.Namespace:
+    """
+    Parse "argv" (with the shared "--output" option), rejecting unknown
+    benchmark names.
+    """
+
+    parser.add_argument("--output", help="write results to csv file")
+
+    args = parser.parse_args(argv)
+    known = set(benchmarks)
+    for name in args.benchmarks:
+        if name not in known:
+            parser.error(f'Unknown benchmark "{name}".')
+    return args
+
+
+def report_results(results_df: pd.DataFrame, output: Optional[str]) -> None:
+    """
+    Print the results table and write it to the csv file "output".
+    """
+
+    with pd.option_context(
+        "display.width",
+        200,
+        "display.max_columns",
+        None,
+        "display.float_format",
+        lambda value: f"{value:.3f}",
+    ):
+        print()
+        print(results_df)
+
+    if output is not None:
+        results_df.to_csv(output)
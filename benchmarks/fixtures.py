@@ -0,0 +1,342 @@
+"""
+Raw MISO report/api fixtures generated from the parsed example data
+in "examples/data/miso".
+
+The first day of each example dataset is used as a template which is
+shifted to any requested date. LMP data can be scaled up to realistic
+all-node sizes by adding synthetic nodes ("extra_nodes").
+"""
+
+import datetime as dt
+import functools
+import io
+import json
+import os
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from powerviz.miso import MISOMarketReport
+
+DATA_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "examples", "data", "miso"
+)
+TIMEZONE = pytz.timezone("EST")
+
+FUEL_CATEGORIES = {
+    "coal": "Coal",
+    "natural_gas": "Natural Gas",
+    "nuclear": "Nuclear",
+    "hydro": "Hydro",
+    "wind": "Wind",
+    "solar": "Solar",
+    "other": "Other",
+    "imports": "Imports",
+}
+
+
+def read_day_template(path: str) -> pd.DataFrame:
+    """
+    First day of an example dataset with "start" replaced by
+    "offset" (time since start of day).
+    """
+
+    df = pd.read_csv(path)
+    start = pd.to_datetime(df["start"].str[:19])
+    day = start.dt.normalize()
+    df = df[day == day.min()].drop(columns=["start", "end"])
+    df.insert(0, "offset", (start - day.min())[df.index])
+    return df.reset_index(drop=True)
+
+
+class MISOFixtures:
+    def __init__(self, data_dir: str = DATA_DIR, extra_nodes: int = 0) -> None:
+        self.data_dir = data_dir
+        self.extra_nodes = extra_nodes
+
+    def template(
+        self, dataset: str, interval: str = "history"
+    ) -> pd.DataFrame:
+        return read_day_template(
+            os.path.join(self.data_dir, dataset, f"{interval}.csv")
+        )
+
+    @functools.cached_property
+    def realtime_lmp_template(self) -> pd.DataFrame:
+        return self.add_extra_nodes(self.template("real_time_lmp"))
+
+    @functools.cached_property
+    def dayahead_lmp_template(self) -> pd.DataFrame:
+        return self.add_extra_nodes(self.template("day_ahead_lmp"))
+
+    def add_extra_nodes(self, lmp_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add synthetic nodes with prices based on the hub prices.
+        """
+
+        if self.extra_nodes == 0:
+            return lmp_df
+
+        hubs = lmp_df["node"].unique()
+        hub_dfs = [lmp_df[lmp_df["node"] == hub] for hub in hubs]
+
+        rng = np.random.default_rng(0)
+        node_dfs = [lmp_df]
+        for i in range(self.extra_nodes):
+            node_df = hub_dfs[i % len(hubs)].copy()
+            node_df["node"] = f"NODE.{i:05d}"
+            noise = rng.normal(0.0, 1.0, size=len(node_df)).round(2)
+            node_df["mcc"] = node_df["mcc"] + noise
+            node_df["lmp"] = node_df["lmp"] + noise
+            node_dfs.append(node_df)
+
+        return (
+            pd.concat(node_dfs)
+            .sort_values(by=["offset", "node"], kind="stable")
+            .reset_index(drop=True)
+        )
+
+    # api data
+
+    def load_api_json(self, now: dt.datetime) -> bytes:
+        load_df = self.template("load", "today")
+        forecast_df = self.template("forecast", "today")
+        day = self.to_day(now)
+
+        load_df = load_df[day + load_df["offset"] <= now]
+        load_json = {
+            "LoadInfo": {
+                "RefId": self.refid(now),
+                "MediumTermLoadForecast": [
+                    {
+                        "Forecast": {
+                            "HourEnding": str(offset.seconds // 3600 + 1),
+                            "LoadForecast": f"{forecast:.0f}",
+                        }
+                    }
+                    for offset, forecast in zip(
+                        forecast_df["offset"], forecast_df["forecast"]
+                    )
+                ],
+                "FiveMinTotalLoad": [
+                    {
+                        "Load": {
+                            "Time": (
+                                f"{offset.seconds // 3600:02d}:"
+                                f"{offset.seconds % 3600 // 60:02d}"
+                            ),
+                            "Value": f"{load:.0f}",
+                        }
+                    }
+                    for offset, load in zip(load_df["offset"], load_df["load"])
+                ],
+            }
+        }
+        return json.dumps(load_json).encode()
+
+    def fuel_mix_api_json(self, now: dt.datetime) -> bytes:
+        fuel_mix = self.template("fuel_mix", "latest").iloc[0]
+        interval = self.to_interval(now)
+
+        fuel_mix_json: dict[str, Any] = {
+            "RefId": self.refid(now),
+            "TotalMW": f"{fuel_mix['total']:.0f}",
+            "Fuel": {
+                "Type": [
+                    {
+                        "INTERVALEST": interval.strftime(
+                            "%Y-%m-%d %I:%M:%S %p"
+                        ),
+                        "CATEGORY": category,
+                        "ACT": f"{fuel_mix[col]:.0f}",
+                    }
+                    for col, category in FUEL_CATEGORIES.items()
+                    if col in fuel_mix.index
+                ]
+            },
+        }
+        return json.dumps(fuel_mix_json).encode()
+
+    def realtime_lmp_api_csv(self, now: dt.datetime, latest: bool) -> bytes:
+        lmp_df = self.realtime_lmp_template
+        day = self.to_day(now)
+
+        start = day.replace(tzinfo=None) + lmp_df["offset"]
+        interval = self.to_interval(now).replace(tzinfo=None)
+        mask = start == interval if latest else start <= interval
+
+        csv_df = pd.DataFrame(
+            {
+                "INTERVAL": start[mask].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+                "CPNODE": lmp_df["node"][mask],
+                "LMP": lmp_df["lmp"][mask],
+                "MLC": lmp_df["mlc"][mask],
+                "MCC": lmp_df["mcc"][mask],
+            }
+        )
+        return csv_df.to_csv(index=False).encode()
+
+    # market report files
+
+    def market_report(
+        self, report: MISOMarketReport, market_date: dt.date
+    ) -> bytes:
+        if report == MISOMarketReport.FORECAST_AND_LOAD:
+            return self.forecast_and_load_report(market_date)
+        if report == MISOMarketReport.GENERATION_FUEL_MIX:
+            return self.fuel_mix_report(market_date)
+        if report == MISOMarketReport.REALTIME_EXANTE_LMP:
+            return self.realtime_exante_lmp_report(market_date)
+        return self.dayahead_lmp_report(
+            market_date,
+            expost=report == MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        )
+
+    def forecast_and_load_report(self, market_date: dt.date) -> bytes:
+        forecast_df = self.template("forecast")
+        load_df = self.template("load")
+        day = dt.datetime.combine(market_date, dt.time())
+
+        header = [
+            "Market Day",
+            "HourEnding",
+            "MISO MTLF (MWh)",
+            "MISO ActualLoad (MWh)",
+        ]
+        rows: list[list[Any]] = [
+            ["Daily Forecast and Actual Load by Local Resource Zone"],
+            [f"Market Day: {market_date:%Y-%m-%d}"],
+            ["Generated by powerviz benchmark fixtures"],
+            ["All times are EST"],
+            header,
+            ["", "", "MWh", "MWh"],
+        ]
+        for hour, (forecast, load) in enumerate(
+            zip(forecast_df["forecast"], load_df["load"]), start=1
+        ):
+            rows.append([day, hour, forecast, load])
+        # next day forecast (skipped by parser)
+        for hour, forecast in enumerate(forecast_df["forecast"], start=1):
+            rows.append([day + dt.timedelta(days=1), hour, forecast, None])
+
+        return self.to_xlsx(rows, sheet_name="Sheet1")
+
+    def fuel_mix_report(self, market_date: dt.date) -> bytes:
+        fuel_mix_df = self.template("fuel_mix")
+        fuel_cols = [
+            col for col in fuel_mix_df.columns if col in FUEL_CATEGORIES
+        ]
+
+        header = (
+            ["Region", "HE"]
+            + [
+                "Gas" if col == "natural_gas" else col.title()
+                for col in fuel_cols
+            ]
+            + ["MISO"]
+        )
+        rows: list[list[Any]] = [
+            ["Real-Time Generation Fuel Mix"],
+            ["Generated by powerviz benchmark fixtures"],
+            [f"Market Date: {market_date:%Y-%m-%d}"],
+            ["All times are EST"],
+            header,
+        ]
+        for hour, (_, row) in enumerate(fuel_mix_df.iterrows(), start=1):
+            rows.append(
+                ["MISO", hour]
+                + [row[col] for col in fuel_cols]
+                + [row["total"]]
+            )
+
+        return self.to_xlsx(rows, sheet_name="RT Generation Fuel Mix")
+
+    def realtime_exante_lmp_report(self, market_date: dt.date) -> bytes:
+        lmp_df = self.realtime_lmp_template
+        day = dt.datetime.combine(market_date, dt.time())
+
+        report_df = pd.DataFrame(
+            {
+                "Time (EST)": day + lmp_df["offset"],
+                "CP Node": lmp_df["node"],
+                "RT Ex-Ante LMP": lmp_df["lmp"],
+                "RT Ex-Ante MLC": lmp_df["mlc"],
+                "RT Ex-Ante MCC": lmp_df["mcc"],
+            }
+        )
+
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            pd.DataFrame(
+                [
+                    ["5-Minute Real-Time Ex-Ante LMPs"],
+                    [f"Market Date: {market_date:%Y-%m-%d}"],
+                    ["Generated by powerviz benchmark fixtures"],
+                ]
+            ).to_excel(writer, header=False, index=False)
+            report_df.to_excel(writer, startrow=3, index=False)
+            pd.DataFrame([["Prices are preliminary."]]).to_excel(
+                writer, startrow=4 + len(report_df), header=False, index=False
+            )
+        return buffer.getvalue()
+
+    def dayahead_lmp_report(self, market_date: dt.date, expost: bool) -> bytes:
+        lmp_df = self.dayahead_lmp_template
+        hours = lmp_df["offset"].dt.seconds // 3600 + 1
+
+        # wide format, one row per node and value type
+        wide_df = (
+            lmp_df.assign(hour=hours.map(lambda hour: f"HE {hour}"))
+            .melt(
+                id_vars=["node", "hour"],
+                value_vars=["lmp", "mcc", "mlc"],
+                var_name="Value",
+            )
+            .pivot(index=["node", "Value"], columns="hour", values="value")
+        )
+        wide_df = wide_df[[f"HE {hour}" for hour in range(1, 25)]]
+        wide_df = wide_df.reset_index().rename(columns={"node": "Node"})
+        wide_df["Value"] = wide_df["Value"].str.upper()
+        wide_df.insert(1, "Type", "Hub")
+
+        kind = "ExPost" if expost else "ExAnte"
+        lines = [
+            f"Day Ahead Market {kind} LMPs",
+            f"{market_date:%m/%d/%Y}",
+            "",
+            '"All Hours-Ending are Eastern Standard Time (EST)"',
+        ]
+        return ("\n".join(lines) + "\n").encode() + wide_df.to_csv(
+            index=False
+        ).encode()
+
+    @staticmethod
+    def to_xlsx(rows: list[list[Any]], sheet_name: str) -> bytes:
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_excel(
+            buffer,
+            sheet_name=sheet_name,
+            header=False,
+            index=False,
+            engine="xlsxwriter",
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def to_day(now: dt.datetime) -> dt.datetime:
+        return now.astimezone(TIMEZONE).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    @staticmethod
+    def to_interval(now: dt.datetime) -> dt.datetime:
+        now = now.astimezone(TIMEZONE)
+        return now.replace(
+            minute=now.minute - now.minute % 5, second=0, microsecond=0
+        )
+
+    @classmethod
+    def refid(cls, now: dt.datetime) -> str:
+        return cls.to_interval(now).strftime("%d-%b-%Y - Interval %H:%M EST")
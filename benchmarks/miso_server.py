@@ -0,0 +1,237 @@
+"""
+Local stand-in for MISO's servers (DataBroker api, BIReporter api and
+market report files), serving fixtures from "benchmarks/fixtures.py".
+
+Latency, bandwidth and 404/429 errors can be injected to emulate
+network conditions. Point a client at the server with "use_server".
+
+    async with serve(ServerConfig(latency=0.05)) as server:
+        async with MISOClient() as client:
+            use_server(client, server.base_url)
+            df = await client.get_realtime_lmp_data(dates)
+"""
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import datetime as dt
+import io
+import random
+import zipfile
+from typing import AsyncIterator, Optional
+
+from aiohttp import web
+
+from benchmarks.fixtures import TIMEZONE, MISOFixtures
+from powerviz.miso import MISOClient, MISOMarketReport
+
+# report file suffixes and whether files are named by publish date
+# (day after market date), see "MISOClient.market_report_filename"
+REPORT_FILES = {
+    "df_al.xls": (MISOMarketReport.FORECAST_AND_LOAD, True),
+    "sr_gfm.xlsx": (MISOMarketReport.GENERATION_FUEL_MIX, True),
+    "da_exante_lmp.csv": (MISOMarketReport.DAYAHEAD_EXANTE_LMP, False),
+    "da_expost_lmp.csv": (MISOMarketReport.DAYAHEAD_EXPOST_LMP, False),
+    "5min_exante_lmp.xlsx": (MISOMarketReport.REALTIME_EXANTE_LMP, True),
+}
+
+
+@dataclasses.dataclass
+class ServerConfig:  # pylint: disable=too-many-instance-attributes
+    """
+    latency: seconds before sending response headers
+    bandwidth: bytes per second per response (None for unlimited)
+    not_found_rate: fraction of requests failing with 404
+    too_many_requests_rate: fraction of requests failing with 429
+    retry_after: "Retry-After" header (seconds) sent with 429s
+    archived_before: daily report files published before this date
+        are only available as monthly archives
+    first_archive: no report files are published before this date
+        (None for no limit)
+    extra_nodes: synthetic nodes added to LMP data
+    """
+
+    latency: float = 0.0
+    bandwidth: Optional[float] = None
+    not_found_rate: float = 0.0
+    too_many_requests_rate: float = 0.0
+    retry_after: Optional[int] = None
+    archived_before: dt.date = dt.date(2021, 1, 1)
+    first_archive: Optional[dt.date] = None
+    extra_nodes: int = 0
+    seed: int = 0
+
+
+class MISOServer:
+    def __init__(self, config: Optional[ServerConfig] = None) -> None:
+        self.config = config if config is not None else ServerConfig()
+        self.fixtures = MISOFixtures(extra_nodes=self.config.extra_nodes)
+        self.requests: collections.Counter[tuple[str, int]] = (
+            collections.Counter()
+        )
+        self.base_url = ""
+
+        self._rng = random.Random(self.config.seed)
+        self._files: dict[str, bytes | None] = {}
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(
+            "/MISORTWDDataBroker/DataBrokerServices.asmx", self.data_broker
+        )
+        app.router.add_get("/MISORTWDBIReporter/Reporter.asmx", self.reporter)
+        app.router.add_get("/marketreports/{filename}", self.market_report)
+        return app
+
+    async def data_broker(self, request: web.Request) -> web.StreamResponse:
+        message_type = request.query.get("messageType")
+        now = dt.datetime.now(TIMEZONE)
+        if message_type == "gettotalload":
+            body = self.fixtures.load_api_json(now)
+        elif message_type == "getfuelmix":
+            body = self.fixtures.fuel_mix_api_json(now)
+        else:
+            body = None
+        return await self.respond(request, body, "application/json")
+
+    async def reporter(self, request: web.Request) -> web.StreamResponse:
+        message_type = request.query.get("messageType")
+        now = dt.datetime.now(TIMEZONE)
+        body: bytes | None = None
+        if message_type in ("currentinterval", "rollingmarketday"):
+            body = self.fixtures.realtime_lmp_api_csv(
+                now, latest=message_type == "currentinterval"
+            )
+        return await self.respond(request, body, "text/csv")
+
+    async def market_report(self, request: web.Request) -> web.StreamResponse:
+        filename = request.match_info["filename"]
+        if filename not in self._files:
+            # generating large files is slow, don't block other requests
+            self._files[filename] = await asyncio.to_thread(
+                self.market_report_file, filename
+            )
+        return await self.respond(
+            request, self._files[filename], "application/octet-stream"
+        )
+
+    def market_report_file(self, filename: str) -> bytes | None:
+        date_str, _, suffix = filename.partition("_")
+        today = dt.datetime.now(TIMEZONE).date()
+
+        # daily file, e.g. "20210101_da_expost_lmp.csv"
+        if suffix in REPORT_FILES:
+            report, by_publish_date = REPORT_FILES[suffix]
+            date = dt.datetime.strptime(date_str, "%Y%m%d").date()
+            if date < self.config.archived_before or date > today:
+                return None
+            market_date = date - dt.timedelta(days=int(by_publish_date))
+            return self.fixtures.market_report(report, market_date)
+
+        # monthly archive, e.g. "202012_da_expost_lmp_csv.zip"
+        daily_suffix = suffix.removesuffix(".zip")
+        daily_suffix = ".".join(daily_suffix.rsplit("_", maxsplit=1))
+        if not suffix.endswith(".zip") or daily_suffix not in REPORT_FILES:
+            return None
+        report, by_publish_date = REPORT_FILES[daily_suffix]
+        month = dt.datetime.strptime(date_str, "%Y%m").date()
+        if month >= self.config.archived_before or (
+            self.config.first_archive is not None
+            and month < self.config.first_archive
+        ):
+            return None
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zfile:
+            date = month
+            while date.month == month.month:
+                market_date = date - dt.timedelta(days=int(by_publish_date))
+                zfile.writestr(
+                    f"{date:%Y%m%d}_{daily_suffix}",
+                    self.fixtures.market_report(report, market_date),
+                )
+                date += dt.timedelta(days=1)
+        return buffer.getvalue()
+
+    async def respond(
+        self, request: web.Request, body: bytes | None, content_type: str
+    ) -> web.StreamResponse:
+        config = self.config
+
+        if config.latency > 0:
+            await asyncio.sleep(config.latency)
+
+        status = 200
+        if body is None or self._rng.random() < config.not_found_rate:
+            status = 404
+        elif self._rng.random() < config.too_many_requests_rate:
+            status = 429
+        self.requests[(request.path, status)] += 1
+
+        if status == 404:
+            raise web.HTTPNotFound()
+        if status == 429:
+            headers = (
+                {"Retry-After": str(config.retry_after)}
+                if config.retry_after is not None
+                else None
+            )
+            raise web.HTTPTooManyRequests(headers=headers)
+
+        assert body is not None
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        response.content_length = len(body)
+        await response.prepare(request)
+
+        # HEAD requests only get headers
+        if request.method == "HEAD":
+            return response
+
+        chunk_size = 2**16
+        for i in range(0, len(body), chunk_size):
+            chunk = body[i : i + chunk_size]
+            await response.write(chunk)
+            if config.bandwidth is not None:
+                await asyncio.sleep(len(chunk) / config.bandwidth)
+        await response.write_eof()
+        return response
+
+
+@contextlib.asynccontextmanager
+async def serve(
+    config: Optional[ServerConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> AsyncIterator[MISOServer]:
+    server = MISOServer(config)
+    runner = web.AppRunner(server.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    # resolve port if chosen by os
+    bound_host, bound_port = runner.addresses[0][:2]
+    server.base_url = f"http://{bound_host}:{bound_port}"
+
+    try:
+        yield server
+    finally:
+        await runner.cleanup()
+
+
+def use_server(client: MISOClient, base_url: str) -> None:
+    """
+    Point all of "client"'s urls at the server at "base_url".
+    """
+
+    for attr in (
+        "LOAD_API_URL",
+        "FUEL_MIX_API_URL",
+        "REALTIME_LMP_LATEST_API_URL",
+        "REALTIME_LMP_TODAY_API_URL",
+        "MARKET_REPORTS_URL",
+    ):
+        url: str = getattr(client, attr)
+        path = url.split("://", maxsplit=1)[-1].split("/", maxsplit=1)[-1]
+        setattr(client, attr, f"{base_url}/{path}")
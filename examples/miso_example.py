@@ -14,10 +14,7 @@ def save_df_csv(df: pd.DataFrame, save_path: str, save_name: str) -> None:
     df.to_csv(os.path.join(save_path, save_name), index=False)
 
 
-async def main() -> None:
-    # Data client
-    miso_client = MISOClient(concurrent_limit=25)
-
+async def get_miso_data(miso_client: MISOClient) -> None:
     # Data range
     # 2020 Dec 28 - 2021 Jan 4
     # Example range chosen b/c at time of writing
@@ -91,5 +88,11 @@ async def main() -> None:
         print("\n")
 
 
+async def main() -> None:
+    # Data client
+    async with MISOClient(concurrent_limit=25) as miso_client:
+        await get_miso_data(miso_client)
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+Checkpointed, resumable backfills of historical data into a
+"ParquetDataset".
+
+Each market day is written to the dataset as soon as it is parsed and
+then recorded in a "BackfillManifest". Rerunning an interrupted (or
+partially failed) backfill skips the days already completed, and
+since dataset writes are deduplicated on the primary key, days written
+but not yet recorded are simply skipped when written again.
+"""
+
+import asyncio
+import datetime as dt
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Literal, Optional, TypeAlias
+
+import pandas as pd
+
+from powerviz.dataset import ParquetDataset
+from powerviz.miso import MISOClient
+from powerviz.types import Dataset
+
+# "completed": written to the dataset
+# "missing": no report file published (yet), retried until recorded
+#   after the report is finalized
+# "failed": download or parse failed, retried by the next backfill
+DayStatus: TypeAlias = Literal["completed", "missing", "failed"]
+
+
+class BackfillManifest:
+    """
+    Status of each (dataset, market day) of backfills, in a sqlite
+    file at "path".
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.path.expanduser(os.fspath(path))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS days ("
+                "dataset TEXT NOT NULL, "
+                "date TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "rows INTEGER, "
+                "error TEXT, "
+                "updated REAL NOT NULL, "
+                "PRIMARY KEY (dataset, date));"
+            )
+
+    def statuses(self, dataset: str) -> dict[dt.date, DayStatus]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, status FROM days WHERE dataset = ?;",
+                (dataset,),
+            ).fetchall()
+        return {dt.date.fromisoformat(date): status for date, status in rows}
+
+    def missing_days(self, dataset: str) -> dict[dt.date, float]:
+        """
+        Missing market days of "dataset" and when they were recorded
+        (unix time).
+        """
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, updated FROM days "
+                "WHERE dataset = ? AND status = 'missing';",
+                (dataset,),
+            ).fetchall()
+        return {dt.date.fromisoformat(date): updated for date, updated in rows}
+
+    def mark(
+        self,
+        dataset: str,
+        dates: Iterable[dt.date],
+        status: DayStatus,
+        rows: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO days "
+                "(dataset, date, status, rows, error, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?);",
+                [
+                    (dataset, date.isoformat(), status, rows, error, now)
+                    for date in dates
+                ],
+            )
+
+    def summary(self, dataset: str) -> pd.DataFrame:
+        """
+        Status, rows written and error of each market day of "dataset",
+        indexed and sorted by date.
+        """
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, status, rows, error, updated FROM days "
+                "WHERE dataset = ? ORDER BY date;",
+                (dataset,),
+            ).fetchall()
+
+        summary_df = pd.DataFrame(
+            rows, columns=["date", "status", "rows", "error", "updated"]
+        )
+        summary_df["date"] = pd.to_datetime(summary_df["date"]).dt.date
+        summary_df["rows"] = summary_df["rows"].astype("Int64")
+        summary_df["updated"] = pd.to_datetime(
+            summary_df["updated"], unit="s", utc=True
+        )
+        return summary_df.set_index("date")
+
+    def clear(self, dataset: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM days WHERE dataset = ?;", (dataset,)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def backfill(
+    client: MISOClient,
+    dataset: Dataset,
+    dates: list[dt.datetime],
+    sink: ParquetDataset,
+    manifest: BackfillManifest,
+    name: Optional[str] = None,
+    retry_failed: bool = True,
+    retry_missing: bool = False,
+    **kwargs: Any,
+) -> pd.DataFrame:
+    """
+    Backfill historical "dataset" data for "dates" into "sink" (as
+    dataset "name", default "dataset"), returns the manifest summary of
+    "dates" (see "BackfillManifest.summary").
+
+    Market days already completed (and failed or missing days, unless
+    "retry_failed"/"retry_missing") are skipped. Every other day is
+    written to "sink" and recorded in "manifest" as soon as it is
+    parsed, so an interrupted backfill resumes where it stopped.
+    Report files of recent days may not be published yet, so missing
+    days are retried until they are recorded missing after their
+    report is finalized ("MISOClient.REPORT_FINALIZED_AFTER").
+    Failed days are recorded and skipped instead of aborting the
+    backfill. "kwargs" are passed to "MISOClient.iter_report_days"
+    (e.g. "nodes" or "price_type", give LMP datasets with different
+    nodes or price types different "name"s).
+    """
+
+    if name is None:
+        name = dataset
+
+    dates = [
+        client.to_native_tz(date) for date in client.historical_dates(dates)
+    ]
+    skipped: set[DayStatus] = {"completed"}
+    if not retry_failed:
+        skipped.add("failed")
+    statuses = manifest.statuses(name)
+    missing = {} if retry_missing else manifest.missing_days(name)
+
+    def is_pending(date: dt.datetime) -> bool:
+        if date.date() in missing:
+            # retried unless recorded missing after the report was
+            # finalized
+            finalized = date + client.REPORT_FINALIZED_AFTER
+            return missing[date.date()] < finalized.timestamp()
+        return statuses.get(date.date()) not in skipped
+
+    pending = {date.date(): date for date in dates if is_pending(date)}
+
+    failed: set[dt.date] = set()
+
+    def on_error(date: dt.datetime, err: Exception) -> None:
+        failed.add(date.date())
+        manifest.mark(name, [date.date()], "failed", error=repr(err))
+
+    async for date, df in client.iter_report_days(
+        dataset, list(pending.values()), on_error=on_error, **kwargs
+    ):
+        rows = await asyncio.to_thread(sink.write, name, df)
+        manifest.mark(name, [date.date()], "completed", rows=rows)
+        pending.pop(date.date(), None)
+
+    # days without a report file (all others are failed or completed)
+    manifest.mark(name, set(pending) - failed, "missing")
+
+    summary_df = manifest.summary(name)
+    return summary_df[summary_df.index.isin({date.date() for date in dates})]
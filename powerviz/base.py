@@ -1,40 +1,157 @@
 import abc
 import asyncio
-import atexit
+import concurrent.futures
 import datetime as dt
-from typing import Optional, TypeAlias
+import hashlib
+import io
+import json
+import multiprocessing
+import tempfile
+import time
+import urllib.parse
+import warnings
+from types import TracebackType
+from typing import (
+    IO,
+    Any,
+    Awaitable,
+    Callable,
+    Literal,
+    Optional,
+    TypeAlias,
+    TypeVar,
+)
 
 import aiohttp
+import numpy as np
+import pandas as pd
 import pytz
 import tenacity
 
+from powerviz.cache import ChangeState, ChangeTracker, FileCache
+from powerviz.limiter import AdaptiveLimiter, LimiterSlot
+from powerviz.retry import CircuitBreaker, RetryBudget, RetryPolicy
+from powerviz.tracing import RequestTrace, RequestTracer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore [assignment]
+
 RequestParams: TypeAlias = dict[str, int | str | list[str]]
 
+T = TypeVar("T")
+C = TypeVar("C", bound="BaseClient")
+
+
+def json_loads(data: bytes | str) -> Any:
+    """
+    Decode JSON with "orjson" if installed (several times faster on
+    api payloads), otherwise with the standard library.
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_object(data: bytes | str | dict[str, Any]) -> dict[str, Any]:
+    """
+    JSON object "data", decoded with "json_loads" if raw.
+    """
+
+    if isinstance(data, (bytes, str)):
+        return json_loads(data)
+    return data
 
-def is_retryable_error(error: BaseException) -> bool:
-    # TODO : retry errors
-    # aiohttp.ClientResponseError: 429, message='Too Many Requests'
-    # aiohttp.ClientResponseError: 404, message='Not Found'
-    # don't retry 404 not found
-    if isinstance(error, aiohttp.ClientResponseError):
-        if error.status == 404:
-            return False
-    retryable_errors = [aiohttp.ClientConnectionError]
-    for re_error in retryable_errors:
-        if isinstance(error, re_error):
-            return True
-    return False
 
+def create_session(
+    limit: int = 0,
+    limit_per_host: int = 50,
+    keepalive_timeout: float = 60.0,
+    ttl_dns_cache: int = 300,
+    trace_configs: Optional[list[aiohttp.TraceConfig]] = None,
+) -> aiohttp.ClientSession:
+    """
+    Session with a connector tuned for long running clients
+    (keep-alive connections, cached dns lookups and a per host
+    connection limit). Can be shared between clients.
 
-class BaseClient(abc.ABC):
+    Total connections are unlimited by default ("limit=0"), since
+    clients already limit concurrent requests.
+    """
+
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=None),
+        connector=aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=ttl_dns_cache,
+        ),
+        trace_configs=trace_configs,
+    )
+
+
+def create_parse_executor(
+    max_workers: Optional[int] = None,
+) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Process pool for parsing report files. Workers are started with
+    "forkserver" (or "spawn") instead of forking the client's process,
+    which is running an event loop and threads.
+    Can be shared between clients.
+    """
+
+    method = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+    mp_context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        # workers fork from a server with parsing libraries imported
+        mp_context.set_forkserver_preload(["powerviz.miso"])
+
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=mp_context
+    )
+
+
+def parse_file_data(parse_fn: Callable[[IO[bytes]], T], data: bytes) -> T:
+    """
+    Parse raw file contents (runs in parse executor workers).
+    """
+
+    return parse_fn(io.BytesIO(data))
+
+
+class BaseClient(abc.ABC):  # pylint: disable=too-many-instance-attributes
     NAME: str = ""
     TIMEZONE: str = ""
 
+    # streamed downloads are kept in memory up to "SPOOL_MAX_SIZE"
+    # bytes before rolling over to a temp file on disk
+    CHUNK_SIZE: int = 2**16  # 64 KiB
+    SPOOL_MAX_SIZE: int = 2**23  # 8 MiB
+
+    # seconds that api responses are reused for (see "_single_flight"),
+    # only bodies up to "MEMO_MAX_SIZE" bytes are kept for reuse
+    RESPONSE_TTL: float = 30.0
+    MEMO_MAX_SIZE: int = 2**20  # 1 MiB
+
     def __init__(
         self,
         concurrent_limit: int = 100,
         session: Optional[aiohttp.ClientSession] = None,
         timeout: Optional[aiohttp.ClientTimeout] = None,
+        cache: Optional[FileCache] = None,
+        adaptive_concurrency: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        change_tracker: Optional[ChangeTracker] = None,
+        tracer: Optional[RequestTracer] = None,
+        parse_workers: int = 0,
+        parse_executor: Optional[concurrent.futures.Executor] = None,
     ) -> None:
         if self.NAME == "":
             raise NotImplementedError('"NAME" attribute must be defined.')
@@ -43,22 +160,26 @@ class BaseClient(abc.ABC):
         if self.TIMEZONE not in pytz.all_timezones_set:
             raise ValueError('"{self.TIMEZONE}" is not a valid timezone.')
 
-        self.session = (
-            session
-            if session is not None
-            else aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=None),
-                connector=aiohttp.TCPConnector(
-                    limit=None  # type: ignore [arg-type]
-                ),
-            )
-        )
+        # optional network tracing (sessions passed in must be created
+        # with "tracer.trace_config" for connection level timings)
+        self.tracer = tracer
 
-        # semaphore for limiting connections
-        self.semaphore = asyncio.BoundedSemaphore(concurrent_limit)
+        # sessions passed in can be shared between clients and are
+        # left open, otherwise session is created on first use and
+        # closed with the client (see "close")
+        self._session = session
+        self._owns_session = session is None
 
-        # make sure client is closed at exit
-        atexit.register(asyncio.run, self.session.close())
+        # limiter for concurrent connections
+        # adaptive limiter probes for the highest concurrency the server
+        # tolerates (up to "concurrent_limit"), otherwise limit is fixed
+        self.limiter = (
+            AdaptiveLimiter(max_limit=concurrent_limit)
+            if adaptive_concurrency
+            else AdaptiveLimiter(
+                max_limit=concurrent_limit, min_limit=concurrent_limit
+            )
+        )
 
         # timeout limits for every individial data get request
         self.timeout = (
@@ -67,31 +188,486 @@ class BaseClient(abc.ABC):
             else aiohttp.ClientTimeout(total=None)
         )
 
-    @tenacity.retry(
-        reraise=True,
-        wait=tenacity.wait_fixed(wait=10),
-        stop=tenacity.stop_after_attempt(max_attempt_number=10),
-        retry=tenacity.retry_if_exception(is_retryable_error),
-    )
+        # optional on-disk cache for downloaded files
+        self.cache = cache
+
+        # retries share a budget across all requests of the client
+        # and each host gets its own circuit breaker
+        self.retry_policy = (
+            retry_policy if retry_policy is not None else RetryPolicy()
+        )
+        self.retry_budget = RetryBudget(
+            ratio=self.retry_policy.budget_ratio,
+            max_tokens=self.retry_policy.budget_max_tokens,
+        )
+        self.circuit_breakers: dict[str, CircuitBreaker] = {}
+
+        # last seen versions of polled endpoints (in memory by default)
+        self.change_tracker = (
+            change_tracker if change_tracker is not None else ChangeTracker()
+        )
+
+        # in flight requests and short lived memoized responses
+        self._in_flight: dict[str, asyncio.Future[Any]] = {}
+        self._memo: dict[str, tuple[float, Any]] = {}
+
+        # report files are parsed in the event loop's thread by default,
+        # or in a process pool (created on first use) with
+        # "parse_workers" processes, executors passed in can be shared
+        # and are left running
+        if parse_workers < 0:
+            raise ValueError('Expected "parse_workers >= 0".')
+        self.parse_workers = parse_workers
+        self._parse_executor = parse_executor
+        self._owns_parse_executor = parse_executor is None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or (
+            self._owns_session and self._session.closed
+        ):
+            self._session = create_session(
+                trace_configs=(
+                    [self.tracer.trace_config]
+                    if self.tracer is not None
+                    else None
+                )
+            )
+        return self._session
+
+    @property
+    def semaphore(self) -> LimiterSlot:
+        """
+        Deprecated, connections are limited by "limiter"
+        (use "async with client.limiter.acquire(): ...").
+        """
+
+        warnings.warn(
+            '"semaphore" is deprecated, use "limiter.acquire()" instead.',
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self.limiter.acquire()
+
+    @property
+    def parse_executor(self) -> concurrent.futures.Executor | None:
+        if self._parse_executor is None and self.parse_workers > 0:
+            self._parse_executor = create_parse_executor(self.parse_workers)
+        return self._parse_executor
+
+    @property
+    def parse_inline(self) -> bool:
+        """
+        Whether files are parsed in the event loop (checked without
+        creating the parse executor).
+        """
+
+        return self._parse_executor is None and self.parse_workers == 0
+
+    async def close(self) -> None:
+        # shared sessions and executors are closed by their owner
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        if self._owns_parse_executor and self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+
+    async def _parse_file_data(
+        self, parse_fn: Callable[[IO[bytes]], T], data: bytes | IO[bytes]
+    ) -> T:
+        """
+        Parse file contents ("data" is raw bytes or an open file) in
+        the parse executor.
+        "parse_fn" must be picklable (e.g. a classmethod or a
+        module level function) unless parsing in the event loop.
+
+        Files are parsed in place in the event loop, only raw bytes
+        are sent to the executor (files are read first, see
+        "parse_inline").
+        """
+
+        executor = self.parse_executor
+        if executor is None:
+            if isinstance(data, bytes):
+                return parse_file_data(parse_fn, data)
+            return parse_fn(data)
+
+        if not isinstance(data, bytes):
+            data = await asyncio.to_thread(data.read)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, parse_file_data, parse_fn, data
+        )
+
+    async def __aenter__(self: C) -> C:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
     async def _fetch(
         self,
         url: str,
         params: Optional[RequestParams] = None,
+        headers: Optional[dict[str, str]] = None,
+        method: str = "GET",
+        trace: Optional[RequestTrace] = None,
     ) -> aiohttp.ClientResponse:
-        resp: aiohttp.ClientResponse
-        async with self.semaphore:
-            resp = await self.session.get(
-                url, raise_for_status=True, params=params, timeout=self.timeout
+        """
+        Request "url" retrying failures according to "retry_policy".
+        Requests to hosts with an open circuit fail immediately
+        with "CircuitOpenError".
+
+        Request timings are recorded in "trace" (started here if not
+        given and the client has a tracer, see "_start_trace").
+        """
+
+        host = urllib.parse.urlsplit(url).hostname or ""
+        breaker = self.circuit_breakers.get(host)
+        if breaker is None:
+            breaker = self.circuit_breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=self.retry_policy.breaker_failure_threshold,
+                reset_timeout=self.retry_policy.breaker_reset_timeout,
             )
+
+        self.retry_budget.deposit()
+
+        if trace is None:
+            trace = self._start_trace(url, method)
+
+        resp: aiohttp.ClientResponse
+        async for attempt in tenacity.AsyncRetrying(
+            reraise=True,
+            wait=self.retry_policy.wait,
+            stop=tenacity.stop_after_attempt(self.retry_policy.max_attempts),
+            retry=self._should_retry,
+        ):
+            with attempt:
+                if trace is not None:
+                    trace.attempts = attempt.retry_state.attempt_number
+                breaker.check()
+                try:
+                    queued_start = time.monotonic()
+                    async with self.limiter.acquire():
+                        if trace is not None:
+                            trace.queued += time.monotonic() - queued_start
+                        resp = await self.session.request(
+                            method,
+                            url,
+                            raise_for_status=True,
+                            params=params,
+                            headers=headers,
+                            timeout=self.timeout,
+                            trace_request_ctx=trace,
+                        )
+                except BaseException as err:
+                    breaker.record(err)
+                    raise err
+                breaker.record(None)
+
         return resp
 
+    def _start_trace(self, url: str, method: str) -> RequestTrace | None:
+        return (
+            self.tracer.start(self.endpoint(url), url, method)
+            if self.tracer is not None
+            else None
+        )
+
+    def endpoint(self, url: str) -> str:
+        """
+        Label used to aggregate request traces of "url".
+        """
+
+        split_url = urllib.parse.urlsplit(url)
+        return f"{split_url.hostname}{split_url.path}"
+
+    def _should_retry(self, retry_state: tenacity.RetryCallState) -> bool:
+        error = (
+            retry_state.outcome.exception()
+            if retry_state.outcome is not None
+            else None
+        )
+        if error is None:
+            return False
+
+        # the budget is only spent on attempts that are retried
+        # (never on the last attempt)
+        return (
+            retry_state.attempt_number < self.retry_policy.max_attempts
+            and self.retry_policy.is_retryable(error)
+            and self.retry_budget.withdraw()
+        )
+
+    async def _fetch_data(
+        self,
+        url: str,
+        immutable: bool = False,
+        use_cache: bool = True,
+        ttl: Optional[float] = None,
+    ) -> bytes:
+        """
+        Fetch the full body of "url" (see "_fetch_file").
+
+        Identical concurrent requests share a single request, and
+        bodies up to "MEMO_MAX_SIZE" bytes (e.g. api responses, not
+        report downloads) are reused for "ttl" seconds (default
+        "RESPONSE_TTL").
+        """
+
+        async def fetch() -> bytes:
+            with await self._fetch_file(
+                url, immutable=immutable, use_cache=use_cache
+            ) as file:
+                return file.read()
+
+        return await self._single_flight(
+            f"data:{url}:{immutable}:{use_cache}",
+            fetch,
+            ttl,
+            memoize=lambda data: len(data) <= self.MEMO_MAX_SIZE,
+        )
+
+    async def _fetch_json(self, url: str, ttl: Optional[float] = None) -> Any:
+        """
+        Fetch and decode JSON from "url" (bypassing the file cache).
+
+        Identical concurrent requests share a single request and decode,
+        and the result is reused for "ttl" seconds (default
+        "RESPONSE_TTL"). Returned objects are shared, don't modify them.
+        """
+
+        async def fetch() -> Any:
+            data = await self._fetch_data(url, use_cache=False, ttl=0.0)
+            return json_loads(data)
+
+        return await self._single_flight(f"json:{url}", fetch, ttl)
+
+    async def _fetch_if_changed(
+        self, url: str, key: str
+    ) -> tuple[bytes, ChangeState] | None:
+        """
+        Fetch "url" unless it is unchanged since the last version
+        tracked for "key". Sends conditional request headers if the
+        server provided validators, otherwise compares content hashes.
+
+        Returns None if unchanged, otherwise the body and the new
+        state, which the caller stages with "change_tracker.update"
+        (committed once the new data has been handled).
+        """
+
+        state = self.change_tracker.get(key)
+        headers: dict[str, str] = {}
+        if state is not None:
+            if state.etag is not None:
+                headers["If-None-Match"] = state.etag
+            if state.last_modified is not None:
+                headers["If-Modified-Since"] = state.last_modified
+
+        async def fetch() -> tuple[int, bytes, Optional[str], Optional[str]]:
+            resp = await self._fetch(url, headers=headers)
+            async with resp:
+                return (
+                    resp.status,
+                    await resp.read(),
+                    resp.headers.get("ETag"),
+                    resp.headers.get("Last-Modified"),
+                )
+
+        # consumers sending the same validators share the request
+        status, data, etag, last_modified = await self._single_flight(
+            f"changed:{url}:{sorted(headers.items())}", fetch, ttl=0.0
+        )
+        if status == 304:
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        if state is not None and digest == state.digest:
+            return None
+
+        return data, ChangeState(
+            digest=digest,
+            etag=etag,
+            last_modified=last_modified,
+            marker=state.marker if state is not None else None,
+        )
+
+    async def _single_flight(
+        self,
+        key: str,
+        fetch_fn: Callable[[], Awaitable[T]],
+        ttl: Optional[float] = None,
+        memoize: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """
+        Result of "fetch_fn", shared by identical concurrent requests
+        ("key"). Results are reused for "ttl" seconds (default
+        "RESPONSE_TTL") if "memoize" (if given) accepts them, and
+        evicted once they expire.
+        """
+
+        ttl = ttl if ttl is not None else self.RESPONSE_TTL
+
+        now = time.monotonic()
+        memo = self._memo.get(key)
+        if memo is not None and memo[0] > now:
+            return memo[1]
+
+        # join request already in flight, shielded so a cancelled caller
+        # doesn't cancel the request for everyone else
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch_fn())
+            self._in_flight[key] = task
+            task.add_done_callback(
+                lambda task: self._single_flight_done(key, task, ttl, memoize)
+            )
+
+        return await asyncio.shield(task)
+
+    def _single_flight_done(
+        self,
+        key: str,
+        task: "asyncio.Future[T]",
+        ttl: float,
+        memoize: Optional[Callable[[T], bool]],
+    ) -> None:
+        self._in_flight.pop(key, None)
+
+        if ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if memoize is not None and not memoize(result):
+            return
+
+        memo = (time.monotonic() + ttl, result)
+        self._memo[key] = memo
+        # evicted when expired, so results aren't kept until the next
+        # request (unless replaced by a newer result)
+        task.get_loop().call_later(ttl, self._evict_memo, key, memo)
+
+    def _evict_memo(self, key: str, memo: tuple[float, Any]) -> None:
+        if self._memo.get(key) is memo:
+            del self._memo[key]
+
+    async def _fetch_file(
+        self,
+        url: str,
+        immutable: bool = False,
+        use_cache: bool = True,
+    ) -> IO[bytes]:
+        """
+        Fetch "url" into a seekable file object going through the
+        file cache (if configured and "use_cache").
+
+        The response is streamed in chunks into a spooled temp file,
+        so large files never need to be fully held in memory. With a
+        cache, the temp file is then copied into the cache and the
+        cached file is returned (opened from disk).
+        Cached immutable files are returned without any request.
+        Other cached files are revalidated using "ETag"/"Last-Modified".
+        """
+
+        cache = self.cache if use_cache else None
+
+        headers: dict[str, str] = {}
+        entry = cache.get(url) if cache is not None else None
+        if cache is not None and entry is not None:
+            if entry.immutable:
+                return cache.open(entry)
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        # streamed body chunks aren't seen by the tracer's hooks
+        trace = self._start_trace(url, "GET")
+        resp = await self._fetch(url, headers=headers, trace=trace)
+        async with resp:
+            if cache is not None and entry is not None:
+                if resp.status == 304:
+                    cache.touch(url, immutable=immutable)
+                    return cache.open(entry)
+
+            # returned to (and closed by) the caller, closed here only
+            # if fetching fails
+            # pylint: disable-next=consider-using-with
+            file: IO[bytes] = tempfile.SpooledTemporaryFile(
+                max_size=self.SPOOL_MAX_SIZE
+            )
+            try:
+                async for chunk in resp.content.iter_chunked(self.CHUNK_SIZE):
+                    file.write(chunk)
+                    if trace is not None:
+                        trace.chunk_received(len(chunk))
+            except BaseException:
+                file.close()
+                raise
+        file.seek(0)
+
+        if cache is not None:
+            # hashing and copying (large archives) in a thread, so other
+            # downloads aren't stalled
+            try:
+                entry = await asyncio.to_thread(
+                    cache.put_file,
+                    url,
+                    file,
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"),
+                    immutable=immutable,
+                )
+                # files too large to cache (or already evicted by a
+                # concurrent insert) are returned from the temp file
+                if entry is not None:
+                    cached_file = cache.open(entry)
+                    file.close()
+                    return cached_file
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                file.close()
+                raise
+            file.seek(0)
+
+        return file
+
     async def check_url_exists(self, url: str) -> bool:
+        """
+        Check if "url" exists without downloading the body.
+        Uses a HEAD request, falling back to a single byte ranged GET
+        if the server doesn't allow HEAD requests.
+
+        Concurrent checks of the same url (e.g. lookups of dates in
+        the same month) share a single request.
+        """
+
+        return await self._single_flight(
+            f"exists:{url}", lambda: self._check_url_exists(url), ttl=0.0
+        )
+
+    async def _check_url_exists(self, url: str) -> bool:
+        resp: aiohttp.ClientResponse
         try:
-            resp = await self._fetch(url)
+            resp = await self._fetch(url, method="HEAD")
         except aiohttp.ClientResponseError as err:
             if err.status == 404:
                 return False
-            raise err
+            if err.status not in (405, 501):
+                raise err
+
+            try:
+                resp = await self._fetch(url, headers={"Range": "bytes=0-0"})
+            except aiohttp.ClientResponseError as range_err:
+                if range_err.status == 404:
+                    return False
+                raise range_err
 
         resp.close()
         return True
@@ -108,6 +684,42 @@ class BaseClient(abc.ABC):
         # timezone unaware, assume localized and explicitly add timezone
         return pytz.timezone(cls.TIMEZONE).localize(date_time)
 
+    @classmethod
+    def to_native_tz_series(
+        cls,
+        datetimes: pd.Series,
+        ambiguous: bool | Literal["infer", "NaT", "raise"] = False,
+        nonexistent: Literal[
+            "shift_forward", "shift_backward", "NaT", "raise"
+        ] = "shift_forward",
+    ) -> pd.Series:
+        """
+        Vectorized "to_native_tz" for a whole column, returning a
+        timezone aware "datetime64" column.
+
+        Aware datetimes are converted. Naive datetimes are localized:
+        "ambiguous" times (repeated hour when DST ends) are treated as
+        standard time by default, like "to_native_tz". "nonexistent"
+        times (skipped hour when DST starts) are shifted forward.
+        """
+
+        if not pd.api.types.is_datetime64_any_dtype(datetimes):
+            datetimes = pd.to_datetime(datetimes)
+
+        tz = pytz.timezone(cls.TIMEZONE)
+        if datetimes.dt.tz is not None:
+            return datetimes.dt.tz_convert(tz)
+
+        return datetimes.dt.tz_localize(
+            tz,
+            ambiguous=(
+                np.full(len(datetimes), ambiguous)
+                if isinstance(ambiguous, bool)
+                else ambiguous
+            ),
+            nonexistent=nonexistent,
+        )
+
     @classmethod
     def is_today(cls, datetime: dt.datetime) -> bool:
         date = cls.to_native_tz(datetime).date()
@@ -0,0 +1,536 @@
+import dataclasses
+import datetime as dt
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import IO, Any, Literal, Optional
+
+import pandas as pd
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    url: str
+    digest: str
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    immutable: bool
+
+
+class FileCache:
+    """
+    Content-addressed on-disk cache for downloaded files.
+
+    File contents are stored once per sha256 digest under
+    "{directory}/objects". A small sqlite index maps urls to digests
+    along with the validators ("ETag"/"Last-Modified") needed for
+    revalidating files which may still change. Entries marked as
+    immutable are never revalidated.
+
+    Once the total size of cached files exceeds "max_size" bytes,
+    the least recently used entries are evicted. Files larger than
+    "max_size" are never cached.
+    """
+
+    CHUNK_SIZE = 2**20  # 1 MiB
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        max_size: int = 10 * 2**30,  # 10 GiB
+    ) -> None:
+        self.directory = os.path.expanduser(os.fspath(directory))
+        self.max_size = max_size
+
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"),
+            check_same_thread=False,
+        )
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "url TEXT PRIMARY KEY, "
+                "digest TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "etag TEXT, "
+                "last_modified TEXT, "
+                "immutable INTEGER NOT NULL, "
+                "last_access REAL NOT NULL);"
+            )
+
+    def get(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, digest, size, etag, last_modified, immutable "
+                "FROM entries WHERE url = ?;",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            url, digest, size, etag, last_modified, immutable = row
+            entry = CacheEntry(
+                url=url,
+                digest=digest,
+                size=size,
+                etag=etag,
+                last_modified=last_modified,
+                immutable=bool(immutable),
+            )
+
+            # index and objects can diverge if objects are
+            # removed by hand, treat as a miss
+            if not os.path.exists(self.object_path(entry.digest)):
+                self._delete(url)
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE url = ?;",
+                    (time.time(), url),
+                )
+
+        return entry
+
+    def read(self, entry: CacheEntry) -> bytes:
+        with self.open(entry) as file:
+            return file.read()
+
+    def open(self, entry: CacheEntry) -> IO[bytes]:
+        return open(self.object_path(entry.digest), "rb")
+
+    def put(
+        self,
+        url: str,
+        data: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        immutable: bool = False,
+    ) -> CacheEntry | None:
+        return self.put_file(
+            url,
+            io.BytesIO(data),
+            etag=etag,
+            last_modified=last_modified,
+            immutable=immutable,
+        )
+
+    def put_file(
+        self,
+        url: str,
+        file: IO[bytes],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        immutable: bool = False,
+    ) -> CacheEntry | None:
+        """
+        Copy "file" (from its current position) into the cache
+        in chunks, so large files are never fully held in memory.
+
+        Returns None (nothing is cached) if the file is larger than
+        "max_size". Other entries are evicted to make room, never the
+        inserted entry itself.
+        """
+
+        objects_dir = os.path.join(self.directory, "objects")
+
+        # write to temp file and rename so readers
+        # never see partially written objects
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=objects_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                while chunk := file.read(self.CHUNK_SIZE):
+                    sha256.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+            if size > self.max_size:
+                os.remove(tmp_path)
+                return None
+
+            digest = sha256.hexdigest()
+            path = self.object_path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            # don't leave orphaned temp files behind
+            # if the copy or the rename fails
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        entry = CacheEntry(
+            url=url,
+            digest=digest,
+            size=size,
+            etag=etag,
+            last_modified=last_modified,
+            immutable=immutable,
+        )
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?);",
+                    (
+                        entry.url,
+                        entry.digest,
+                        entry.size,
+                        entry.etag,
+                        entry.last_modified,
+                        int(entry.immutable),
+                        time.time(),
+                    ),
+                )
+            self._evict(keep=url)
+
+        return entry
+
+    def touch(self, url: str, immutable: bool) -> None:
+        """
+        Mark entry as recently used (e.g. after revalidation).
+        """
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ?, immutable = ? "
+                    "WHERE url = ?;",
+                    (time.time(), int(immutable), url),
+                )
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._total_size()
+
+    def clear(self) -> None:
+        with self._lock:
+            urls = [
+                row[0]
+                for row in self._conn.execute("SELECT url FROM entries;")
+            ]
+            for url in urls:
+                self._delete(url)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _total_size(self) -> int:
+        # objects shared by multiple urls are only stored once
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM "
+            "(SELECT DISTINCT digest, size FROM entries);"
+        ).fetchone()
+        return int(row[0])
+
+    def _evict(self, keep: str) -> None:
+        # drop least recently used entries (except "keep", the entry
+        # just inserted) until under size limit
+        total_size = self._total_size()
+        if total_size <= self.max_size:
+            return
+
+        rows = self._conn.execute(
+            "SELECT url FROM entries WHERE url != ? "
+            "ORDER BY last_access ASC;",
+            (keep,),
+        ).fetchall()
+        for (url,) in rows:
+            if total_size <= self.max_size:
+                break
+            total_size -= self._delete(url)
+
+    def _delete(self, url: str) -> int:
+        # returns the size of the removed object (0 if still shared)
+        row = self._conn.execute(
+            "SELECT digest, size FROM entries WHERE url = ?;", (url,)
+        ).fetchone()
+        if row is None:
+            return 0
+
+        digest, size = row
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE url = ?;", (url,))
+
+        # only remove object once no other url references it
+        (refs,) = self._conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE digest = ?;", (digest,)
+        ).fetchone()
+        if refs > 0:
+            return 0
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        return int(size)
+
+
+@dataclasses.dataclass(frozen=True)
+class URLIndexEntry:
+    url: Optional[str]  # None if resolved as missing
+    resolved_at: float
+    permanent: bool
+
+
+class URLIndex:
+    """
+    Small persistent index of resolved urls (e.g. market date -> report
+    file url) so repeated requests don't need to probe the server.
+
+    Permanent entries (e.g. archived files) never expire. Other resolved
+    urls expire after "resolved_ttl" and missing results after
+    "missing_ttl" since files are published and archived over time.
+
+    If "path" is None, the index only lives in memory.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | os.PathLike[str]] = None,
+        resolved_ttl: dt.timedelta = dt.timedelta(days=7),
+        missing_ttl: dt.timedelta = dt.timedelta(hours=1),
+    ) -> None:
+        self.path = (
+            os.path.expanduser(os.fspath(path)) if path is not None else None
+        )
+        self.resolved_ttl = resolved_ttl
+        self.missing_ttl = missing_ttl
+
+        self._entries: dict[str, URLIndexEntry] = {}
+        self._dirty = False
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._entries = {
+                    key: URLIndexEntry(**entry)
+                    for key, entry in json.load(file).items()
+                }
+
+    def get(self, key: str) -> URLIndexEntry | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.permanent:
+            return entry
+
+        ttl = self.resolved_ttl if entry.url is not None else self.missing_ttl
+        if time.time() - entry.resolved_at > ttl.total_seconds():
+            del self._entries[key]
+            self._dirty = True
+            return None
+
+        return entry
+
+    def set(
+        self, key: str, url: Optional[str], permanent: bool = False
+    ) -> None:
+        self._entries[key] = URLIndexEntry(
+            url=url, resolved_at=time.time(), permanent=permanent
+        )
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+
+        write_json(
+            self.path,
+            {
+                key: dataclasses.asdict(entry)
+                for key, entry in self._entries.items()
+            },
+        )
+        self._dirty = False
+
+
+@dataclasses.dataclass(frozen=True)
+class ChangeState:
+    digest: str  # sha256 of the last response body
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    marker: Optional[str] = None  # e.g. "RefId" or last interval
+
+
+class ChangeTracker:
+    """
+    Tracks the last seen version of polled endpoints, so unchanged
+    responses can be skipped before parsing.
+
+    States are keyed per consumer of an endpoint (e.g. load and
+    forecast data both come from the same endpoint).
+
+    New states are staged by "update" and only replace the last seen
+    versions once committed ("commit" or "save"), so callers commit
+    once the new data has been handled (e.g. inserted into a database).
+    If handling fails, the next poll returns the data again. If "path"
+    is None, states only live in memory.
+    """
+
+    def __init__(self, path: Optional[str | os.PathLike[str]] = None) -> None:
+        self.path = (
+            os.path.expanduser(os.fspath(path)) if path is not None else None
+        )
+
+        self._states: dict[str, ChangeState] = {}
+        self._pending: dict[str, ChangeState] = {}
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._states = {
+                    key: ChangeState(**state)
+                    for key, state in json.load(file).items()
+                }
+
+    def get(self, key: str) -> ChangeState | None:
+        return self._states.get(key)
+
+    def update(self, key: str, state: ChangeState) -> bool:
+        """
+        Stage new state for "key" (see "commit"). Returns False if the
+        marker is unchanged (i.e. response changed, but no new data),
+        such states are committed right away.
+        """
+
+        previous = self._states.get(key)
+        if (
+            previous is not None
+            and state.marker is not None
+            and state.marker == previous.marker
+        ):
+            self._states[key] = state
+            self._pending.pop(key, None)
+            return False
+
+        self._pending[key] = state
+        return True
+
+    def commit(self) -> None:
+        """
+        Mark all staged states as seen.
+        """
+
+        self._states |= self._pending
+        self._pending.clear()
+
+    def save(self) -> None:
+        """
+        Commit staged states (see "commit") and write them to "path".
+        """
+
+        self.commit()
+        if self.path is None:
+            return
+
+        write_json(
+            self.path,
+            {
+                key: dataclasses.asdict(state)
+                for key, state in self._states.items()
+            },
+        )
+
+
+class ParsedReportCache:
+    """
+    On-disk cache of parsed report dataframes, one columnar file
+    (parquet or feather, requires "pyarrow") per report and market date
+    under "{directory}/{report}/{version}/{date}.{file_format}".
+
+    "version" identifies the parser and a hash of its code (see
+    "powerviz.reports.parser_version"), so entries written by older
+    parser logic are never read back.
+    Unused versions can be removed with "prune".
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        file_format: Literal["parquet", "feather"] = "parquet",
+    ) -> None:
+        if file_format not in ("parquet", "feather"):
+            raise ValueError('Expected "parquet" or "feather" file format.')
+
+        self.directory = os.path.expanduser(os.fspath(directory))
+        self.file_format = file_format
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, report: str, date: dt.date, version: str) -> str:
+        return os.path.join(
+            self.directory,
+            report,
+            version,
+            f"{date.isoformat()}.{self.file_format}",
+        )
+
+    def contains(self, report: str, date: dt.date, version: str) -> bool:
+        return os.path.exists(self.path(report, date, version))
+
+    def get(
+        self, report: str, date: dt.date, version: str
+    ) -> pd.DataFrame | None:
+        path = self.path(report, date, version)
+        try:
+            if self.file_format == "feather":
+                return pd.read_feather(path)
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+
+    def put(
+        self, report: str, date: dt.date, version: str, df: pd.DataFrame
+    ) -> None:
+        path = self.path(report, date, version)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # write to temp file and rename, see "write_json"
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                if self.file_format == "feather":
+                    df.reset_index(drop=True).to_feather(file)
+                else:
+                    df.to_parquet(file, index=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def prune(self, report: str, version: str) -> None:
+        """
+        Remove cached dataframes of "report" from all other versions.
+        """
+
+        report_dir = os.path.join(self.directory, report)
+        if not os.path.isdir(report_dir):
+            return
+        for entry in os.scandir(report_dir):
+            if entry.is_dir() and entry.name != version:
+                shutil.rmtree(entry.path)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+def write_json(path: str, obj: Any) -> None:
+    # write to temp file and rename so readers
+    # never see partially written files
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(obj, file)
+    os.replace(tmp_path, path)
@@ -0,0 +1,123 @@
+"""
+Compact (memory budget) representation of parsed dataframes.
+
+Compact dataframes have:
+- float32 values (prices, loads and fuel mixes), ~7 significant
+  digits, which keeps the parsed 2 decimals exact below ~131,000
+- int32 node codes of the client's "NodeCatalog" instead of
+  categorical/string node names
+- no "end" column, the (constant) interval is implied and kept in
+  "df.attrs['interval']"
+
+Bytes per row (see "DataFrame.memory_usage"):
+
+    dataset         default     compact
+    lmp             41-44       24  (start 8, node 4, lmp/mlc/mcc 3x4)
+    load/forecast   24          12  (start 8, value 4)
+    fuel mix        16 + 8n     8 + 4n  (n fuel columns, incl. total)
+
+"expand_frame" restores the default schema (float64 values rounded to
+the parsed 2 decimals, categorical nodes and the "end" column).
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from powerviz.nodes import NodeCatalog
+
+INTERVAL_ATTR = "interval"
+
+
+def compact_frame(
+    df: pd.DataFrame, catalog: Optional[NodeCatalog] = None
+) -> pd.DataFrame:
+    """
+    Compact representation of a parsed dataframe. Compacting an
+    already compact dataframe is a no-op. Node columns require the
+    "catalog" their codes refer to.
+    """
+
+    columns: dict[str, pd.Series] = {}
+    attrs = dict(df.attrs)
+    for col in df.columns:
+        values = df[col]
+        if col == "end":
+            interval = interval_of(df)
+            if interval is not None:
+                attrs[INTERVAL_ATTR] = interval
+            continue
+        if col == "node" and not pd.api.types.is_integer_dtype(values.dtype):
+            if catalog is None:
+                raise ValueError('Compacting nodes requires a "catalog".')
+            values = pd.Series(
+                catalog.encode(values).cat.codes.to_numpy(dtype=np.int32),
+                index=values.index,
+            )
+        elif values.dtype == np.float64:
+            values = values.astype(np.float32)
+        columns[col] = values
+
+    compact_df = pd.DataFrame(columns, index=df.index)
+    compact_df.attrs = attrs
+    return compact_df
+
+
+def expand_frame(
+    df: pd.DataFrame,
+    catalog: Optional[NodeCatalog] = None,
+    interval: Optional[pd.Timedelta] = None,
+) -> pd.DataFrame:
+    """
+    Default representation of a compact dataframe. "interval" defaults
+    to "df.attrs['interval']" (which pandas may drop, e.g. when
+    concatenating dataframes with different intervals).
+    """
+
+    if "end" in df.columns:
+        return df
+
+    if interval is None:
+        interval = df.attrs.get(INTERVAL_ATTR)
+    if interval is None and len(df) > 0:
+        raise ValueError('Unknown interval, "interval" is required.')
+
+    columns: dict[str, pd.Series] = {}
+    for col in df.columns:
+        values = df[col]
+        if col == "node" and pd.api.types.is_integer_dtype(values.dtype):
+            if catalog is None:
+                raise ValueError('Expanding nodes requires a "catalog".')
+            values = pd.Series(
+                pd.Categorical.from_codes(values, dtype=catalog.dtype),
+                index=values.index,
+            )
+        elif values.dtype == np.float32:
+            values = values.astype(np.float64).round(2)
+        columns[col] = values
+        if col == "start":
+            columns["end"] = values + (
+                interval if interval is not None else pd.Timedelta(0)
+            )
+
+    expanded_df = pd.DataFrame(columns, index=df.index)
+    expanded_df.attrs = {
+        key: value for key, value in df.attrs.items() if key != INTERVAL_ATTR
+    }
+    return expanded_df
+
+
+def interval_of(df: pd.DataFrame) -> Optional[pd.Timedelta]:
+    """
+    Constant "end - start" interval of a dataframe (None if empty).
+    """
+
+    if len(df) == 0:
+        return None
+
+    intervals = df["end"] - df["start"]
+    interval = intervals.iloc[0]
+    if not (intervals == interval).all():
+        raise ValueError("Intervals are not constant, can't compact.")
+    return pd.Timedelta(interval)
@@ -0,0 +1,239 @@
+import datetime as dt
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+
+from powerviz.merge import key_columns
+
+# pandas/pyarrow filter, e.g. ("node", "in", ["MINN.HUB"])
+Filter = tuple[str, str, Any]
+
+
+class ParquetDataset:
+    """
+    Parquet dataset of parsed dataframes (e.g. "MISOClient" output),
+    partitioned by dataset and market month under
+    "{directory}/{dataset}/year={year}/month={month}/" (requires
+    "pyarrow").
+
+    Dataframes are appended incrementally (one file per partition and
+    write) and deduplicated on their primary key ("start", plus "node"
+    for LMP data) -- rows already in the dataset are skipped, or
+    replaced with "overwrite=True". Reads only open the partitions (and
+    row groups) matching the requested time range and filters.
+
+    Writes of the same dataset must not run concurrently.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = os.path.expanduser(os.fspath(directory))
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def primary_key(df: pd.DataFrame) -> list[str]:
+        return key_columns(df)
+
+    def partition_path(self, dataset: str, year: int, month: int) -> str:
+        return os.path.join(
+            self.directory, dataset, f"year={year}", f"month={month:02d}"
+        )
+
+    def partitions(self, dataset: str) -> list[tuple[int, int]]:
+        """
+        Sorted (year, month) partitions of "dataset".
+        """
+
+        dataset_dir = os.path.join(self.directory, dataset)
+        if not os.path.isdir(dataset_dir):
+            return []
+
+        partitions: list[tuple[int, int]] = []
+        for year_entry in os.scandir(dataset_dir):
+            if not year_entry.name.startswith("year="):
+                continue
+            year = int(year_entry.name.removeprefix("year="))
+            for month_entry in os.scandir(year_entry.path):
+                if month_entry.name.startswith("month=") and any(
+                    self.partition_files(month_entry.path)
+                ):
+                    month = int(month_entry.name.removeprefix("month="))
+                    partitions.append((year, month))
+        return sorted(partitions)
+
+    @staticmethod
+    def partition_files(partition_dir: str) -> list[str]:
+        # files starting with "." (temp files) are ignored like pyarrow
+        return sorted(
+            entry.path
+            for entry in os.scandir(partition_dir)
+            if entry.name.endswith(".parquet")
+            and not entry.name.startswith(".")
+        )
+
+    def write(
+        self, dataset: str, df: pd.DataFrame, overwrite: bool = False
+    ) -> int:
+        """
+        Append "df" to "dataset", returns the number of rows written.
+
+        Rows whose primary key is already in the dataset are skipped,
+        unless "overwrite", which replaces the existing rows (rewriting
+        the affected partitions).
+        """
+
+        key = self.primary_key(df)
+        df = df.drop_duplicates(subset=key, keep="last")
+
+        written = 0
+        start = df["start"]
+        for (year, month), partition_df in df.groupby(
+            [start.dt.year, start.dt.month], sort=True
+        ):
+            partition_dir = self.partition_path(dataset, year, month)
+            os.makedirs(partition_dir, exist_ok=True)
+
+            if overwrite:
+                written += self._rewrite_partition(
+                    partition_dir, partition_df, key
+                )
+            else:
+                written += self._append_partition(
+                    partition_dir, partition_df, key
+                )
+        return written
+
+    def read(
+        self,
+        dataset: str,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+        filters: Sequence[Filter] = (),
+    ) -> pd.DataFrame:
+        """
+        Rows of "dataset" with "start" in [start, end), sorted by
+        primary key. Partitions outside the time range are skipped,
+        "start" and "filters" (e.g. [("node", "in", nodes)]) are pushed
+        down to the parquet row groups.
+        """
+
+        row_filters: list[Filter] = list(filters)
+        if start is not None:
+            row_filters.append(("start", ">=", start))
+        if end is not None:
+            row_filters.append(("start", "<", end))
+
+        # one conjunction per partition in range (partition pruning),
+        # bounds are widened by a day in case they are in another
+        # timezone than the partitions
+        first = start - dt.timedelta(days=1) if start is not None else None
+        last = end + dt.timedelta(days=1) if end is not None else None
+        partitions = [
+            (year, month)
+            for year, month in self.partitions(dataset)
+            if (first is None or (year, month) >= (first.year, first.month))
+            and (last is None or (year, month) <= (last.year, last.month))
+        ]
+        if len(partitions) == 0:
+            return pd.DataFrame(columns=list(columns or []))
+
+        df = pd.read_parquet(
+            os.path.join(self.directory, dataset),
+            columns=(
+                None
+                if columns is None
+                else list(dict.fromkeys(["start", *columns]))
+            ),
+            filters=[
+                [("year", "=", year), ("month", "=", month), *row_filters]
+                for year, month in partitions
+            ],
+        )
+        df = df.drop(
+            columns=[col for col in ("year", "month") if col in df.columns]
+        )
+
+        key = [col for col in self.primary_key(df) if col in df.columns]
+        df = df.sort_values(by=key, ignore_index=True)
+        return df[list(columns)] if columns is not None else df
+
+    def remove(self, dataset: str) -> None:
+        shutil.rmtree(
+            os.path.join(self.directory, dataset), ignore_errors=True
+        )
+
+    def _append_partition(
+        self, partition_dir: str, df: pd.DataFrame, key: list[str]
+    ) -> int:
+        # only keys in the time range of the new rows can collide
+        files = self.partition_files(partition_dir)
+        if len(files) > 0:
+            existing_df = pd.read_parquet(
+                files,
+                columns=key,
+                partitioning=None,
+                filters=[
+                    ("start", ">=", df["start"].min()),
+                    ("start", "<=", df["start"].max()),
+                ],
+            )
+            if len(existing_df) > 0:
+                df = df[
+                    ~self._key_index(df, key).isin(
+                        self._key_index(existing_df, key)
+                    )
+                ]
+
+        if len(df) == 0:
+            return 0
+        self._write_file(partition_dir, df)
+        return len(df)
+
+    def _rewrite_partition(
+        self, partition_dir: str, df: pd.DataFrame, key: list[str]
+    ) -> int:
+        written = len(df)
+        files = self.partition_files(partition_dir)
+        if len(files) > 0:
+            # partition columns are only in the path
+            existing_df = pd.read_parquet(files, partitioning=None)
+            existing_df = existing_df[
+                ~self._key_index(existing_df, key).isin(
+                    self._key_index(df, key)
+                )
+            ]
+            df = pd.concat([existing_df, df], ignore_index=True)
+
+        self._write_file(
+            partition_dir, df.sort_values(by=key, ignore_index=True)
+        )
+        for path in files:
+            os.remove(path)
+        return written
+
+    @staticmethod
+    def _key_index(df: pd.DataFrame, key: list[str]) -> pd.Index:
+        if len(key) == 1:
+            return pd.Index(df[key[0]])
+        return pd.MultiIndex.from_frame(
+            df[key].astype({col: object for col in key if col != "start"})
+        )
+
+    @staticmethod
+    def _write_file(partition_dir: str, df: pd.DataFrame) -> None:
+        # write to (hidden) temp file and rename, see "write_json"
+        name = f"{df['start'].min():%Y%m%dT%H%M}-{uuid.uuid4().hex[:8]}"
+        fd, tmp_path = tempfile.mkstemp(dir=partition_dir, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                df.to_parquet(file, index=False)
+            os.replace(
+                tmp_path, os.path.join(partition_dir, f"{name}.parquet")
+            )
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,158 @@
+import asyncio
+import collections
+import time
+from types import TracebackType
+from typing import Optional
+
+import aiohttp
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """
+    Errors signaling the server (or the path to it) is overloaded.
+    """
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(
+        error,
+        (
+            asyncio.TimeoutError,
+            aiohttp.ServerTimeoutError,
+            aiohttp.ServerDisconnectedError,
+        ),
+    )
+
+
+class AdaptiveLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+    Concurrency limiter using additive-increase/multiplicative-decrease
+    (AIMD), similar to TCP congestion control.
+
+    The limit grows by one after each full window ("limit") of healthy
+    requests, i.e. requests that succeeded with a latency within
+    "latency_tolerance" times the best observed latency. The limit is
+    multiplied by "decrease_factor" on overload errors (429, 5xx,
+    timeouts). Only one decrease is applied per window of requests
+    started before the previous decrease, so a burst of failures
+    doesn't collapse the limit to "min_limit".
+
+    With "min_limit == max_limit" this is a plain fixed size limiter.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 100,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        throughput_window: float = 10.0,
+    ) -> None:
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError('Expected "1 <= min_limit <= max_limit".')
+        if not 0.0 < decrease_factor < 1.0:
+            raise ValueError('Expected "0 < decrease_factor < 1".')
+
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.throughput_window = throughput_window
+
+        self._limit = float(
+            initial_limit
+            if initial_limit is not None
+            else max(min_limit, max_limit // 4)
+        )
+        self._limit = min(max(self._limit, min_limit), max_limit)
+
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._healthy_count = 0
+        self._last_decrease = 0.0
+        self._min_latency = float("inf")
+        self._completions: collections.deque[float] = collections.deque()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def throughput(self) -> float:
+        """
+        Completed requests per second over the last "throughput_window"
+        seconds.
+        """
+
+        self._trim_completions(time.monotonic())
+        return len(self._completions) / self.throughput_window
+
+    def acquire(self) -> "LimiterSlot":
+        return LimiterSlot(self)
+
+    async def acquire_slot(self) -> float:
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._in_flight < self.limit
+            )
+            self._in_flight += 1
+        return time.monotonic()
+
+    async def release_slot(
+        self, started: float, error: Optional[BaseException]
+    ) -> None:
+        now = time.monotonic()
+        latency = now - started
+
+        if error is not None and is_overload_error(error):
+            # only back off once per window of in flight requests
+            if started >= self._last_decrease:
+                self._limit = max(
+                    self.min_limit, self._limit * self.decrease_factor
+                )
+                self._last_decrease = now
+                self._healthy_count = 0
+
+        elif error is None:
+            self._completions.append(now)
+            self._trim_completions(now)
+            self._min_latency = min(self._min_latency, latency)
+            if latency <= self.latency_tolerance * self._min_latency:
+                self._healthy_count += 1
+                if self._healthy_count >= self.limit:
+                    self._limit = min(self.max_limit, self._limit + 1)
+                    self._healthy_count = 0
+
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _trim_completions(self, now: float) -> None:
+        while (
+            len(self._completions) > 0
+            and now - self._completions[0] > self.throughput_window
+        ):
+            self._completions.popleft()
+
+
+class LimiterSlot:
+    def __init__(self, limiter: AdaptiveLimiter) -> None:
+        self.limiter = limiter
+        self.started = 0.0
+
+    async def __aenter__(self) -> "LimiterSlot":
+        self.started = await self.limiter.acquire_slot()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.limiter.release_slot(self.started, exc)
@@ -0,0 +1,129 @@
+"""
+Combining sorted per-file dataframes without a global sort.
+
+Parsed report files each cover one market day, so their dataframes
+are (nearly) sorted by key already and their time ranges don't
+overlap. Dataframes are only sorted where needed and concatenated in
+time order; only overlapping dataframes are merged by sorting.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def key_columns(df: pd.DataFrame) -> list[str]:
+    """
+    Primary key of parsed dataframes ("start", plus "node" for LMP).
+    """
+
+    return ["start", "node"] if "node" in df.columns else ["start"]
+
+
+def key_arrays(df: pd.DataFrame, key: list[str]) -> list[np.ndarray]:
+    """
+    Integer arrays sorting like the key columns ("start" as int64,
+    nodes as categorical codes or compact node codes).
+    """
+
+    arrays: list[np.ndarray] = []
+    for col in key:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays.append(values.cat.codes.to_numpy())
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            arrays.append(pd.DatetimeIndex(values).asi8)
+        else:
+            arrays.append(values.to_numpy())
+    return arrays
+
+
+def sort_order(df: pd.DataFrame, key: list[str]) -> np.ndarray | None:
+    """
+    Row order sorting "df" by "key" (None if already sorted).
+
+    Cheap for parsed report files: rows are in "start" order and list
+    nodes in the same order every interval, so a single interval's
+    node order is applied to all intervals.
+    """
+
+    if len(df) < 2:
+        return None
+
+    arrays = key_arrays(df, key)
+    starts = arrays[0]
+    starts_sorted = bool((starts[1:] >= starts[:-1]).all())
+    if len(arrays) == 1:
+        return None if starts_sorted else np.argsort(starts, kind="stable")
+
+    codes = arrays[1]
+    if starts_sorted:
+        blocks = interval_blocks(starts, codes)
+        if blocks is not None:
+            perm = np.argsort(blocks[0], kind="stable")
+            if (perm == np.arange(len(perm))).all():
+                return None
+            block_starts = np.arange(0, len(df), len(perm))
+            return (block_starts[:, np.newaxis] + perm).ravel()
+
+    # general case, stable sort by start then node
+    return np.lexsort((codes, starts))
+
+
+def interval_blocks(
+    starts: np.ndarray, codes: np.ndarray
+) -> np.ndarray | None:
+    """
+    Node codes as a (intervals, nodes) array if every interval (run of
+    equal sorted "starts") lists the same nodes in the same order.
+    """
+
+    (block_starts,) = np.nonzero(
+        np.concatenate(([True], starts[1:] != starts[:-1]))
+    )
+    size = len(starts) // len(block_starts)
+    if (
+        size * len(block_starts) != len(starts)
+        or not (np.diff(block_starts) == size).all()
+    ):
+        return None
+
+    blocks = codes.reshape(-1, size)
+    return blocks if (blocks == blocks[0]).all() else None
+
+
+def sort_frame(df: pd.DataFrame, key: list[str]) -> pd.DataFrame:
+    order = sort_order(df, key)
+    if order is None:
+        return df
+    return df.take(order)
+
+
+def merge_sorted(dfs: list[pd.DataFrame], key: list[str]) -> pd.DataFrame:
+    """
+    Concatenate "dfs" sorted by "key". Dataframes are ordered by their
+    first "start", and only dataframes with overlapping time ranges
+    are sorted together.
+    """
+
+    sorted_dfs = [sort_frame(df, key) for df in dfs if len(df) > 0]
+    if len(sorted_dfs) == 0:
+        return pd.concat(dfs, ignore_index=True)
+    sorted_dfs.sort(key=lambda df: df["start"].iloc[0])
+
+    # runs of dataframes with overlapping time ranges
+    runs: list[list[pd.DataFrame]] = []
+    run_end = None
+    for df in sorted_dfs:
+        first, last = df["start"].iloc[0], df["start"].iloc[-1]
+        if run_end is not None and first <= run_end:
+            runs[-1].append(df)
+            run_end = max(run_end, last)
+        else:
+            runs.append([df])
+            run_end = last
+
+    merged_dfs = [
+        run[0] if len(run) == 1 else sort_frame(pd.concat(run), key)
+        for run in runs
+    ]
+    return pd.concat(merged_dfs, ignore_index=True)
@@ -3,23 +3,51 @@ TODO:
     - parse future forecasts
 """
 
-import asyncio
+import concurrent.futures
+import dataclasses
 import datetime as dt
 import enum
-import io
+import functools
+import hashlib
+import importlib.util
 import json
-import warnings
-from typing import Callable, Literal, Optional
-from zipfile import ZipFile
+import re
+import urllib.parse
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Callable,
+    Literal,
+    Optional,
+    Sequence,
+)
 
 import aiohttp
 import pandas as pd
 import pytz
-import tqdm
-from tqdm.asyncio import tqdm_asyncio
 
-from powerviz.base import BaseClient
-from powerviz.types import Dates, DatesTypeError
+from powerviz import parsers, reports
+from powerviz.base import BaseClient, json_loads
+from powerviz.cache import (
+    ChangeTracker,
+    FileCache,
+    ParsedReportCache,
+    URLIndex,
+)
+from powerviz.compact import compact_frame, expand_frame
+from powerviz.nodes import NodeCatalog, NodeFilter
+from powerviz.retry import RetryPolicy
+from powerviz.tracing import RequestTracer
+from powerviz.types import (
+    NO_NEW_DATA,
+    Dataset,
+    Dates,
+    DatesTypeError,
+    Nodes,
+    NodesTypeError,
+    NoNewData,
+)
 
 
 class MISOMarketReport(enum.Enum):
@@ -34,7 +62,8 @@ class MISOMarketReport(enum.Enum):
     REALTIME_EXANTE_LMP = "5-Min Real-Time Ex-Ante Locational Marginal Prices"
 
 
-class MISOClient(BaseClient):
+# get/iter/parse/poll methods per dataset
+class MISOClient(BaseClient):  # pylint: disable=too-many-public-methods
     NAME = "MISO"
     TIMEZONE = "EST"
 
@@ -49,35 +78,131 @@ class MISOClient(BaseClient):
         "TEXAS.HUB",
     )
 
+    LOAD_API_URL = (
+        "https://api.misoenergy.org/MISORTWDDataBroker/DataBroker"
+        "Services.asmx?messageType=gettotalload&returnType=json"
+    )
+    FUEL_MIX_API_URL = (
+        "https://api.misoenergy.org/MISORTWDDataBroker/DataBroker"
+        "Services.asmx?messageType=getfuelmix&returnType=json"
+    )
+    REALTIME_LMP_LATEST_API_URL = (
+        "https://api.misoenergy.org/MISORTWDBIReporter/"
+        "Reporter.asmx?messageType=currentinterval&returnType=csv"
+    )
+    REALTIME_LMP_TODAY_API_URL = (
+        "https://api.misoenergy.org/MISORTWDBIReporter/"
+        "Reporter.asmx?messageType=rollingmarketday&returnType=csv"
+    )
+    MARKET_REPORTS_URL = "https://docs.misoenergy.org/marketreports"
+
+    # market report files older than this are treated as final
+    # and are never revalidated when cached
+    REPORT_FINALIZED_AFTER = dt.timedelta(days=7)
+
+    # pandas csv parser engine for large report files
+    CSV_ENGINE: Literal["c", "pyarrow"] = (
+        "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+    )
+
+    # report files downloading or downloaded and not yet read at a time
+    # (at least "2 * parse_workers", see "powerviz.reports")
+    DOWNLOAD_SLOTS = 16
+
+    # parsed reports cached with "parsed_cache" are keyed by a hash of
+    # the parser's code (see "powerviz.reports.parser_version"), bump
+    # when parser output changes without changing that code (e.g. class
+    # attributes used by parsers)
+    PARSER_VERSION = 1
+
+    # api response and report file parsers (see "powerviz.parsers"),
+    # report file parsers are classmethods so they can be pickled
+    parse_load_api_data = parsers.parse_load_api_data
+    parse_forecast_api_data = parsers.parse_forecast_api_data
+    parse_fuel_mix_api_data = parsers.parse_fuel_mix_api_data
+    parse_realtime_expost_lmp_api_data = (
+        parsers.parse_realtime_expost_lmp_api_data
+    )
+    parse_forecast_and_load_market_report = classmethod(
+        parsers.parse_forecast_and_load_market_report
+    )
+    parse_generation_fuel_mix_market_report = classmethod(
+        parsers.parse_generation_fuel_mix_market_report
+    )
+    parse_realtime_exante_lmp_market_report = classmethod(
+        parsers.parse_realtime_exante_lmp_market_report
+    )
+    parse_dayahead_lmp_market_report = classmethod(
+        parsers.parse_dayahead_lmp_market_report
+    )
+
     def __init__(
         self,
         concurrent_limit: int = 25,
         session: Optional[aiohttp.ClientSession] = None,
         timeout: Optional[aiohttp.ClientTimeout] = None,
+        cache: Optional[FileCache] = None,
+        url_index: Optional[URLIndex] = None,
+        parsed_cache: Optional[ParsedReportCache] = None,
+        node_catalog: Optional[NodeCatalog] = None,
+        adaptive_concurrency: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        change_tracker: Optional[ChangeTracker] = None,
+        tracer: Optional[RequestTracer] = None,
+        parse_workers: int = 0,
+        parse_executor: Optional[concurrent.futures.Executor] = None,
     ) -> None:
         super().__init__(
-            concurrent_limit=concurrent_limit, session=session, timeout=timeout
+            concurrent_limit=concurrent_limit,
+            session=session,
+            timeout=timeout,
+            cache=cache,
+            adaptive_concurrency=adaptive_concurrency,
+            retry_policy=retry_policy,
+            change_tracker=change_tracker,
+            tracer=tracer,
+            parse_workers=parse_workers,
+            parse_executor=parse_executor,
         )
 
-    async def get_load_data(self, dates: Dates) -> pd.DataFrame:
+        # resolved market report urls (in memory only by default)
+        self.url_index = url_index if url_index is not None else URLIndex()
+
+        # optional on-disk cache for parsed (finalized) report files
+        self.parsed_cache = parsed_cache
+
+        # categories shared by the node columns of all lmp dataframes
+        self.node_catalog = (
+            node_catalog
+            if node_catalog is not None
+            else NodeCatalog(self.HUB_NAMES)
+        )
+
+    async def get_load_data(
+        self,
+        dates: Optional[Dates] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> pd.DataFrame:
         """
         Real-time load data is given in 5-min intervals from API.
         Historical data is hourly intervals from market report files.
+
+        Historical data can be requested as a list of "dates" or as the
+        range of market dates from "start" to "end" (inclusive), see
+        "requested_dates".
+
+        "compact" returns the compact representation (see
+        "powerviz.compact" and "expand").
         """
 
+        dates, probe_files = self.requested_dates(dates, start, end)
+
         load_df: pd.DataFrame
         if dates in ("latest", "today"):
-            url = (
-                "https://api.misoenergy.org/MISORTWDDataBroker/DataBroker"
-                "Services.asmx?messageType=gettotalload&returnType=json"
-            )
-
-            resp: aiohttp.ClientResponse = await self._fetch(url)
-            json_data: bytes
-            async with resp:
-                json_data = await resp.read()
-
-            load_df = self.parse_load_api_data(json_data)
+            load_json = await self._fetch_json(self.LOAD_API_URL)
+            load_df = self.parse_load_api_data(load_json)
             if dates == "latest":
                 load_df = load_df.iloc[-1:].reset_index(drop=True)
 
@@ -88,112 +213,56 @@ class MISOClient(BaseClient):
                 dates,
                 MISOMarketReport.FORECAST_AND_LOAD,
                 self.parse_forecast_and_load_market_report,
+                compact=compact,
+                probe_files=probe_files,
             )
 
             # exclude forecast col
-            load_df = load_df[["start", "end", "load"]]
+            load_df = load_df.drop(columns="forecast")
 
         else:
             raise DatesTypeError()
 
-        return load_df
-
-    def parse_load_api_data(self, json_data: bytes) -> pd.DataFrame:
-        load_json = json.load(io.BytesIO(json_data))
-
-        refid_str = load_json["LoadInfo"]["RefId"]
-        date = self.parse_api_refid_datetime(refid_str).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
+        return compact_frame(load_df) if compact else load_df
 
-        load_data: list[dict[str, dt.datetime | float]] = []
-        for load_dict in load_json["LoadInfo"]["FiveMinTotalLoad"]:
-            time: str = load_dict["Load"]["Time"]  # {hour}:{minute}
-            load: int = load_dict["Load"]["Value"]
-            hour, minute = (int(t) for t in time.split(":", maxsplit=1))
-
-            start = date.replace(hour=hour, minute=minute)
-            end = start + dt.timedelta(minutes=5)
-
-            load_data.append(
-                {
-                    "start": start,
-                    "end": end,
-                    "load": round(float(load), 2),
-                }
-            )
+    async def iter_load_data(
+        self,
+        dates: Optional[list[dt.datetime]] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Historical load data (see "get_load_data"), one market day at a
+        time as soon as its report file is parsed (not in date order).
+        """
 
-        load_df = pd.DataFrame(load_data).sort_values(
-            by="start", ascending=True, ignore_index=True
-        )
-        return load_df
+        async for _, load_df in self.iter_report_days(
+            "load", dates, compact=compact, start=start, end=end
+        ):
+            yield load_df
 
-    def parse_forecast_and_load_market_report(
-        self, xls_data: bytes
+    async def get_forecast_data(
+        self,
+        dates: Optional[Dates] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
     ) -> pd.DataFrame:
-        forecast_load_df = pd.read_excel(
-            io.BytesIO(xls_data),
-            skiprows=[0, 1, 2, 3, 5],  # skip date and title
-            nrows=24,  # only read current day (skip future forecasts)
-            engine="calamine",  # type: ignore [call-overload]
-        )
-
-        use_cols = [
-            "Market Day",
-            "HourEnding",
-            "MISO MTLF (MWh)",
-            "MISO ActualLoad (MWh)",
-        ]
-        new_cols = [
-            "start",
-            "end",
-            "forecast",
-            "load",
-        ]
-
-        forecast_load_df = forecast_load_df[use_cols].rename(
-            columns=dict(zip(use_cols, new_cols))
-        )
-
-        forecast_load_df["start"] = (
-            pd.to_datetime(forecast_load_df["start"])
-            + pd.to_timedelta(forecast_load_df["end"] - 1, unit="hours")
-        ).apply(self.to_native_tz)
-        forecast_load_df["end"] = forecast_load_df["start"] + dt.timedelta(
-            hours=1
-        )
-        forecast_load_df["forecast"] = (
-            forecast_load_df["forecast"].astype(float).round(2)
-        )
-        forecast_load_df["load"] = (
-            forecast_load_df["load"].astype(float).round(2)
-        )
-
-        forecast_load_df = forecast_load_df.sort_values(
-            by="start", ascending=True, ignore_index=True
-        )
-
-        return forecast_load_df
-
-    async def get_forecast_data(self, dates: Dates) -> pd.DataFrame:
         """
         Real-time forecast data is given in hourly intervals from API.
         Historical data is hourly intervals from market report files.
+
+        "compact" returns the compact representation and "start"/"end"
+        request a range of market dates (see "get_load_data").
         """
 
+        dates, probe_files = self.requested_dates(dates, start, end)
+
         forecast_df: pd.DataFrame
         if dates in ("latest", "today"):
-            url = (
-                "https://api.misoenergy.org/MISORTWDDataBroker/DataBroker"
-                "Services.asmx?messageType=gettotalload&returnType=json"
-            )
-
-            resp: aiohttp.ClientResponse = await self._fetch(url)
-            json_data: bytes
-            async with resp:
-                json_data = await resp.read()
-
-            forecast_df = self.parse_forecast_api_data(json_data)
+            forecast_json = await self._fetch_json(self.LOAD_API_URL)
+            forecast_df = self.parse_forecast_api_data(forecast_json)
             if dates == "latest":
                 current_hour = dt.datetime.now(
                     pytz.timezone(self.TIMEZONE)
@@ -209,52 +278,52 @@ class MISOClient(BaseClient):
                 dates,
                 MISOMarketReport.FORECAST_AND_LOAD,
                 self.parse_forecast_and_load_market_report,
+                compact=compact,
+                probe_files=probe_files,
             )
 
             # exclude load col
-            forecast_df = forecast_df[["start", "end", "forecast"]]
+            forecast_df = forecast_df.drop(columns="load")
 
         else:
             raise DatesTypeError()
 
-        return forecast_df
-
-    def parse_forecast_api_data(self, json_data: bytes) -> pd.DataFrame:
-        forecast_json = json.load(io.BytesIO(json_data))
+        return compact_frame(forecast_df) if compact else forecast_df
 
-        refid_str = forecast_json["LoadInfo"]["RefId"]
-        date = self.parse_api_refid_datetime(refid_str).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-
-        forecast_data: list[dict[str, dt.datetime | float]] = []
-        for forecast_dict in forecast_json["LoadInfo"][
-            "MediumTermLoadForecast"
-        ]:
-            hour: int = int(forecast_dict["Forecast"]["HourEnding"]) - 1
-            forecast: int = forecast_dict["Forecast"]["LoadForecast"]
-            start = date.replace(hour=hour)
-            end = start + dt.timedelta(hours=1)
-
-            forecast_data.append(
-                {
-                    "start": start,
-                    "end": end,
-                    "forecast": round(float(forecast), 2),
-                }
-            )
+    async def iter_forecast_data(
+        self,
+        dates: Optional[list[dt.datetime]] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Historical forecast data, one market day at a time (see
+        "iter_load_data").
+        """
 
-        forecast_df = pd.DataFrame(forecast_data).sort_values(
-            by="start", ascending=True, ignore_index=True
-        )
-        return forecast_df
+        async for _, forecast_df in self.iter_report_days(
+            "forecast", dates, compact=compact, start=start, end=end
+        ):
+            yield forecast_df
 
-    async def get_fuel_mix_data(self, dates: Dates) -> pd.DataFrame:
+    async def get_fuel_mix_data(
+        self,
+        dates: Optional[Dates] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> pd.DataFrame:
         """
         Real-time fuel mix data is given in 5-min intervals from API.
         Historical data is hourly intervals from market report files.
+
+        "compact" returns the compact representation and "start"/"end"
+        request a range of market dates (see "get_load_data").
         """
 
+        dates, probe_files = self.requested_dates(dates, start, end)
+
         # all data for current day is not available from API
         if dates == "today":
             raise NotImplementedError(
@@ -263,17 +332,8 @@ class MISOClient(BaseClient):
 
         fuel_mix_df: pd.DataFrame
         if dates == "latest":
-            url = (
-                "https://api.misoenergy.org/MISORTWDDataBroker/DataBroker"
-                "Services.asmx?messageType=getfuelmix&returnType=json"
-            )
-
-            resp: aiohttp.ClientResponse = await self._fetch(url)
-            json_data: bytes
-            async with resp:
-                json_data = await resp.read()
-
-            fuel_mix_df = self.parse_fuel_mix_api_data(json_data)
+            fuel_mix_json = await self._fetch_json(self.FUEL_MIX_API_URL)
+            fuel_mix_df = self.parse_fuel_mix_api_data(fuel_mix_json)
 
         elif isinstance(dates, list) and all(
             isinstance(date, dt.datetime) for date in dates
@@ -282,102 +342,40 @@ class MISOClient(BaseClient):
                 dates,
                 MISOMarketReport.GENERATION_FUEL_MIX,
                 self.parse_generation_fuel_mix_market_report,
+                compact=compact,
+                probe_files=probe_files,
             )
 
         else:
             raise DatesTypeError()
 
-        return fuel_mix_df
+        return compact_frame(fuel_mix_df) if compact else fuel_mix_df
 
-    def parse_fuel_mix_api_data(self, json_data: bytes) -> pd.DataFrame:
-        fuel_mix_json = json.load(io.BytesIO(json_data))
-
-        refid_str = fuel_mix_json["RefId"]
-        start = self.parse_api_refid_datetime(refid_str)
-        end = start + dt.timedelta(minutes=5)
-
-        fuel_mix_data: dict[str, dt.datetime | float] = {}
-        fuel_mix_data["start"] = start
-        fuel_mix_data["end"] = end
-
-        for fuel_dict in fuel_mix_json["Fuel"]["Type"]:
-            datetime_str: str = fuel_dict["INTERVALEST"]
-            fuel_type: str = fuel_dict["CATEGORY"]
-            fuel_mw_str: str = fuel_dict["ACT"]
-
-            datetime = self.to_native_tz(
-                dt.datetime.strptime(datetime_str, "%Y-%m-%d %I:%M:%S %p")
-            )
-            assert datetime == start
-            fuel_type = fuel_type.lower().replace(" ", "_")
-            fuel_mw = round(float(fuel_mw_str), 2)
-
-            fuel_mix_data[fuel_type] = fuel_mw
-
-        fuel_mix_data["total"] = round(float(fuel_mix_json["TotalMW"]), 2)
+    async def iter_fuel_mix_data(
+        self,
+        dates: Optional[list[dt.datetime]] = None,
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Historical fuel mix data, one market day at a time (see
+        "iter_load_data").
+        """
 
-        fuel_mix_df = pd.DataFrame([fuel_mix_data])
-        return fuel_mix_df
+        async for _, fuel_mix_df in self.iter_report_days(
+            "fuel_mix", dates, compact=compact, start=start, end=end
+        ):
+            yield fuel_mix_df
 
-    def parse_generation_fuel_mix_market_report(
-        self, xlsx_data: bytes
+    async def get_realtime_lmp_data(
+        self,
+        dates: Optional[Dates] = None,
+        nodes: Nodes = "hubs",
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
     ) -> pd.DataFrame:
-        fuel_mix_df = pd.read_excel(
-            io.BytesIO(xlsx_data),
-            sheet_name="RT Generation Fuel Mix",
-            nrows=28,  # include date and title for parsing date
-            engine="calamine",  # type: ignore [call-overload]
-        )
-
-        date = self.to_native_tz(
-            dt.datetime.strptime(
-                fuel_mix_df.iloc[1, 0], "Market Date: %Y-%m-%d"
-            ).replace(hour=0, minute=0, second=0, microsecond=0)
-        )
-
-        header_row = 3
-        fuel_mix_df.columns = fuel_mix_df.iloc[header_row].values
-
-        # skip regional data (only keep whole miso data)
-        # miso data start at "HE" (hour ending) col
-        miso_start_col = fuel_mix_df.columns.get_loc("HE")
-        fuel_mix_df = fuel_mix_df.iloc[header_row + 1 :, miso_start_col:]
-
-        new_cols = {
-            "HE": "start",
-            "Gas": "natural_gas",
-            "MISO": "total",
-        }
-        new_cols |= {
-            col: col.lower()
-            for col in fuel_mix_df.columns
-            if col not in new_cols
-        }
-        fuel_mix_df = fuel_mix_df.rename(columns=new_cols)
-
-        fuel_mix_df["start"] = date + pd.to_timedelta(
-            fuel_mix_df["start"] - 1, unit="hour"
-        )
-        fuel_mix_df["end"] = fuel_mix_df["start"] + dt.timedelta(hours=1)
-        for col in fuel_mix_df.columns:
-            if col not in ("start", "end"):
-                fuel_mix_df[col] = fuel_mix_df[col].astype(float).round(2)
-
-        sort_cols = (
-            ["start", "end"]
-            + [
-                col
-                for col in fuel_mix_df.columns
-                if col not in ("start", "end", "other", "total")
-            ]
-            + ["other", "total"]
-        )
-        fuel_mix_df = fuel_mix_df[sort_cols].sort_values(
-            by="start", ascending=True, ignore_index=True
-        )
-        return fuel_mix_df
-
-    async def get_realtime_lmp_data(self, dates: Dates) -> pd.DataFrame:
         """
         Real-time LMP data is given in 5-min intervals from API.
         Data for current day will use "Ex-Post" price.
@@ -386,26 +384,29 @@ class MISOClient(BaseClient):
 
         MISO's new pricing method Extended LMP (ELMP) is called
         "Ex-Post". Original method is called "Ex-Ante".
+
+        "nodes" selects hubs (default), all nodes, a list of nodes or
+        nodes matching a regex pattern (see "node_catalog").
+
+        "compact" returns the compact representation with nodes coded
+        by "node_catalog", "start"/"end" request a range of market dates
+        (see "get_load_data").
         """
 
+        dates, probe_files = self.requested_dates(dates, start, end)
+        nodes = self.normalize_nodes(nodes)
+
         lmp_df: pd.DataFrame
         if dates in ("latest", "today"):
-            interval: str
+            url: str
             if dates == "latest":
-                interval = "currentinterval"
+                url = self.REALTIME_LMP_LATEST_API_URL
             elif dates == "today":
-                interval = "rollingmarketday"
-            url = (
-                "https://api.misoenergy.org/MISORTWDBIReporter/"
-                f"Reporter.asmx?messageType={interval}&returnType=csv"
-            )
+                url = self.REALTIME_LMP_TODAY_API_URL
 
-            resp: aiohttp.ClientResponse = await self._fetch(url)
-            csv_data: bytes
-            async with resp:
-                csv_data = await resp.read()
+            csv_data = await self._fetch_data(url, use_cache=False)
 
-            lmp_df = self.parse_realtime_expost_lmp_api_data(csv_data)
+            lmp_df = self.parse_realtime_expost_lmp_api_data(csv_data, nodes)
 
         elif isinstance(dates, list) and all(
             isinstance(date, dt.datetime) for date in dates
@@ -413,116 +414,52 @@ class MISOClient(BaseClient):
             lmp_df = await self.retrieve_and_parse_market_report_files(
                 dates,
                 MISOMarketReport.REALTIME_EXANTE_LMP,
-                self.parse_realtime_exante_lmp_market_report,
+                self.lmp_report_parser(
+                    self.parse_realtime_exante_lmp_market_report, nodes
+                ),
+                compact=compact,
+                probe_files=probe_files,
             )
 
         else:
             raise DatesTypeError()
 
-        return lmp_df
-
-    def parse_realtime_expost_lmp_api_data(
-        self, csv_data: bytes
-    ) -> pd.DataFrame:
-        lmp_df = pd.read_csv(io.BytesIO(csv_data))
-
-        use_cols = [
-            "INTERVAL",
-            "CPNODE",
-            "LMP",
-            "MLC",
-            "MCC",
-        ]
-        new_cols = [
-            "start",
-            "node",
-            "lmp",
-            "mlc",
-            "mcc",
-        ]
-        lmp_df = lmp_df[use_cols].rename(columns=dict(zip(use_cols, new_cols)))
-
-        lmp_df = lmp_df[lmp_df["node"].isin(self.HUB_NAMES)]
-
-        lmp_df["start"] = pd.to_datetime(lmp_df["start"]).apply(
-            self.to_native_tz
-        )
-        lmp_df["node"] = lmp_df["node"].astype(pd.CategoricalDtype())
-        lmp_df["lmp"] = lmp_df["lmp"].astype(float).round(2)
-        lmp_df["mlc"] = lmp_df["mlc"].astype(float).round(2)
-        lmp_df["mcc"] = lmp_df["mcc"].astype(float).round(2)
-        lmp_df["end"] = lmp_df["start"] + dt.timedelta(minutes=5)
-
-        cols_order = [
-            "start",
-            "end",
-            "node",
-            "lmp",
-            "mlc",
-            "mcc",
-        ]
-        lmp_df = lmp_df[cols_order].sort_values(
-            by=["start", "node"], ascending=True, ignore_index=True
-        )
-        return lmp_df
-
-    def parse_realtime_exante_lmp_market_report(
-        self, xlsx_data: bytes
-    ) -> pd.DataFrame:
-        lmp_df = pd.read_excel(
-            io.BytesIO(xlsx_data),
-            skiprows=3,  # skip date and description
-            skipfooter=1,  # skip warning
-            engine="calamine",  # type: ignore [call-overload]
-        )
-
-        use_cols = [
-            "Time (EST)",
-            "CP Node",
-            "RT Ex-Ante LMP",
-            "RT Ex-Ante MLC",
-            "RT Ex-Ante MCC",
-        ]
-        new_cols = [
-            "start",
-            "node",
-            "lmp",
-            "mlc",
-            "mcc",
-        ]
-        lmp_df = lmp_df[use_cols].rename(columns=dict(zip(use_cols, new_cols)))
+        return compact_frame(lmp_df, self.node_catalog) if compact else lmp_df
 
-        lmp_df = lmp_df[lmp_df["node"].isin(self.HUB_NAMES)]
+    async def iter_realtime_lmp_data(
+        self,
+        dates: Optional[list[dt.datetime]] = None,
+        nodes: Nodes = "hubs",
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Historical (Ex-Ante) real-time LMP data, one market day at a
+        time (see "iter_load_data" and "get_realtime_lmp_data").
+        """
 
-        lmp_df["start"] = pd.to_datetime(lmp_df["start"]).apply(
-            self.to_native_tz
-        )
-        lmp_df["node"] = lmp_df["node"].astype(pd.CategoricalDtype())
-        lmp_df["lmp"] = lmp_df["lmp"].astype(float).round(2)
-        lmp_df["mlc"] = lmp_df["mlc"].astype(float).round(2)
-        lmp_df["mcc"] = lmp_df["mcc"].astype(float).round(2)
-        lmp_df["end"] = lmp_df["start"] + dt.timedelta(minutes=5)
-
-        cols_order = [
-            "start",
-            "end",
-            "node",
-            "lmp",
-            "mlc",
-            "mcc",
-        ]
-        lmp_df = lmp_df[cols_order].sort_values(
-            by=["start", "node"], ascending=True, ignore_index=True
-        )
-        return lmp_df
+        async for _, lmp_df in self.iter_report_days(
+            "realtime_lmp",
+            dates,
+            nodes=nodes,
+            compact=compact,
+            start=start,
+            end=end,
+        ):
+            yield lmp_df
 
     async def get_dayahead_lmp_data(
         self,
-        dates: Dates,
+        dates: Optional[Dates] = None,
         price_type: Literal[
             MISOMarketReport.DAYAHEAD_EXANTE_LMP,
             MISOMarketReport.DAYAHEAD_EXPOST_LMP,
         ] = MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        nodes: Nodes = "hubs",
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
     ) -> pd.DataFrame:
         """
         Day-ahead LMP data is given in hourly intervals.
@@ -530,14 +467,24 @@ class MISOClient(BaseClient):
 
         Defaults to MISO's new pricing method -- Extended LMP (ELMP),
         which they call Ex-Post. Original method is called Ex-Ante.
+
+        "nodes" selects nodes, "compact" returns the compact
+        representation and "start"/"end" request a range of market
+        dates (see "get_realtime_lmp_data").
         """
 
+        dates, probe_files = self.requested_dates(dates, start, end)
+        parse_fn = self.lmp_report_parser(
+            self.parse_dayahead_lmp_market_report, nodes
+        )
+
         lmp_df: pd.DataFrame
         if dates in ("latest", "today"):
             lmp_df = await self.retrieve_and_parse_market_report_files(
                 [dt.datetime.now(pytz.timezone(self.TIMEZONE))],
                 price_type,
-                self.parse_dayahead_lmp_market_report,
+                parse_fn,
+                compact=compact,
             )
 
             if dates == "latest":
@@ -552,179 +499,254 @@ class MISOClient(BaseClient):
             isinstance(date, dt.datetime) for date in dates
         ):
             lmp_df = await self.retrieve_and_parse_market_report_files(
-                dates, price_type, self.parse_dayahead_lmp_market_report
+                dates,
+                price_type,
+                parse_fn,
+                compact=compact,
+                probe_files=probe_files,
             )
 
         else:
             raise DatesTypeError()
 
-        return lmp_df
+        return compact_frame(lmp_df, self.node_catalog) if compact else lmp_df
 
-    def parse_dayahead_lmp_market_report(
-        self, csv_data: bytes
-    ) -> pd.DataFrame:
-        io_csv_data = io.BytesIO(csv_data)
+    async def iter_dayahead_lmp_data(
+        self,
+        dates: Optional[list[dt.datetime]] = None,
+        price_type: Literal[
+            MISOMarketReport.DAYAHEAD_EXANTE_LMP,
+            MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        ] = MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        nodes: Nodes = "hubs",
+        compact: bool = False,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Historical day-ahead LMP data, one market day at a time (see
+        "iter_load_data" and "get_dayahead_lmp_data").
+        """
 
-        _ = io_csv_data.readline()
-        date_str = io_csv_data.readline().decode().strip("\n\r ")
-        date = self.to_native_tz(
-            dt.datetime.strptime(date_str, "%m/%d/%Y").replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
+        async for _, lmp_df in self.iter_report_days(
+            "dayahead_lmp",
+            dates,
+            nodes=nodes,
+            price_type=price_type,
+            compact=compact,
+            start=start,
+            end=end,
+        ):
+            yield lmp_df
+
+    async def poll_load_data(self) -> pd.DataFrame | NoNewData:
+        """
+        Real-time load data for the current day (see "get_load_data").
+        Returns "NO_NEW_DATA" if no new interval was published since
+        the last poll (see "change_tracker").
+
+        Returned data is only marked as seen once the caller has
+        handled it and calls "change_tracker.commit" (or "save"),
+        otherwise the next poll returns it again.
+        """
+
+        changed = await self._fetch_if_changed(self.LOAD_API_URL, "load")
+        if changed is None:
+            return NO_NEW_DATA
+
+        json_data, state = changed
+        load_json = json_loads(json_data)
+        state = dataclasses.replace(
+            state, marker=load_json["LoadInfo"]["RefId"]
         )
+        if not self.change_tracker.update("load", state):
+            return NO_NEW_DATA
+
+        return self.parse_load_api_data(load_json)
+
+    async def poll_forecast_data(self) -> pd.DataFrame | NoNewData:
+        """
+        Real-time forecast data for the current day
+        (see "get_forecast_data"). Returns "NO_NEW_DATA" if the forecast
+        is unchanged since the last poll (see "change_tracker").
+        """
+
+        changed = await self._fetch_if_changed(self.LOAD_API_URL, "forecast")
+        if changed is None:
+            return NO_NEW_DATA
+
+        json_data, state = changed
+        forecast_json = json_loads(json_data)
 
-        io_csv_data.seek(0)
-        lmp_df = pd.read_csv(
-            io_csv_data,
-            skiprows=4,  # skip date and description
+        # forecast is only updated hourly, track forecast values
+        # instead of the (5-min) refid
+        forecast_str = json.dumps(
+            forecast_json["LoadInfo"]["MediumTermLoadForecast"],
+            sort_keys=True,
         )
+        state = dataclasses.replace(
+            state, marker=hashlib.sha256(forecast_str.encode()).hexdigest()
+        )
+        if not self.change_tracker.update("forecast", state):
+            return NO_NEW_DATA
 
-        use_cols = ["Node", "Value"] + [f"HE {hour}" for hour in range(1, 25)]
-        lmp_df = lmp_df[use_cols]
+        return self.parse_forecast_api_data(forecast_json)
 
-        lmp_df = lmp_df[lmp_df["Node"].isin(self.HUB_NAMES)]
+    async def poll_fuel_mix_data(self) -> pd.DataFrame | NoNewData:
+        """
+        Latest real-time fuel mix data (see "get_fuel_mix_data").
+        Returns "NO_NEW_DATA" if no new interval was published since
+        the last poll (see "change_tracker").
+        """
 
-        lmp_df = (
-            lmp_df.melt(
-                id_vars=["Node", "Value"], var_name="Start", value_name="Price"
-            )
-            .pivot(index=["Start", "Node"], columns="Value", values="Price")
-            .reset_index()
+        changed = await self._fetch_if_changed(
+            self.FUEL_MIX_API_URL, "fuel_mix"
         )
+        if changed is None:
+            return NO_NEW_DATA
 
-        lmp_df.columns.name = ""
+        json_data, state = changed
+        fuel_mix_json = json_loads(json_data)
+        state = dataclasses.replace(state, marker=fuel_mix_json["RefId"])
+        if not self.change_tracker.update("fuel_mix", state):
+            return NO_NEW_DATA
 
-        lmp_df["Start"] = lmp_df["Start"].apply(
-            lambda hour_end_str, date=date: date.replace(
-                hour=int(hour_end_str.split(" ", maxsplit=1)[-1]) - 1
-            )
+        return self.parse_fuel_mix_api_data(fuel_mix_json)
+
+    async def poll_realtime_lmp_data(
+        self, nodes: Nodes = "hubs"
+    ) -> pd.DataFrame | NoNewData:
+        """
+        Real-time LMP data for the current day
+        (see "get_realtime_lmp_data"). Returns "NO_NEW_DATA" if no new
+        interval was published since the last poll
+        (see "change_tracker").
+        """
+
+        changed = await self._fetch_if_changed(
+            self.REALTIME_LMP_TODAY_API_URL, "realtime_lmp"
         )
-        lmp_df["End"] = lmp_df["Start"] + dt.timedelta(hours=1)
-        lmp_df["Node"] = lmp_df["Node"].astype(pd.CategoricalDtype())
-        for col in ("LMP", "MLC", "MCC"):
-            lmp_df[col] = lmp_df[col].astype(float).round(2)
-
-        lmp_df = lmp_df.rename(
-            columns={
-                "Start": "start",
-                "End": "end",
-                "Node": "node",
-                "LMP": "lmp",
-                "MCC": "mcc",
-                "MLC": "mlc",
-            }
+        if changed is None:
+            return NO_NEW_DATA
+
+        csv_data, state = changed
+        lmp_df = self.parse_realtime_expost_lmp_api_data(csv_data, nodes)
+
+        # csv has no refid, track last interval instead
+        last_interval = lmp_df["start"].max() if len(lmp_df) > 0 else None
+        state = dataclasses.replace(
+            state,
+            marker=(
+                last_interval.isoformat()
+                if last_interval is not None
+                else None
+            ),
         )
+        if not self.change_tracker.update("realtime_lmp", state):
+            return NO_NEW_DATA
 
-        lmp_df = lmp_df[
-            ["start", "end", "node", "lmp", "mlc", "mcc"]
-        ].sort_values(by=["start", "node"], ascending=True, ignore_index=True)
         return lmp_df
 
+    async def iter_report_days(
+        self,
+        dataset: Dataset,
+        dates: Optional[list[dt.datetime]] = None,
+        nodes: Nodes = "hubs",
+        price_type: Literal[
+            MISOMarketReport.DAYAHEAD_EXANTE_LMP,
+            MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        ] = MISOMarketReport.DAYAHEAD_EXPOST_LMP,
+        compact: bool = False,
+        on_error: Optional[Callable[[dt.datetime, Exception], None]] = None,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> AsyncIterator[tuple[dt.datetime, pd.DataFrame]]:
+        """
+        Historical "dataset" data for "dates" (or market dates from
+        "start" to "end") as (market date, dataframe) pairs, one market
+        day at a time (see "powerviz.reports.iter_market_report_files").
+        "nodes" only applies to LMP data and "price_type" to day-ahead
+        LMP data.
+        """
+
+        requested, probe_files = self.requested_dates(dates, start, end)
+
+        report: MISOMarketReport
+        parse_fn: Callable[[IO[bytes]], pd.DataFrame]
+        drop_columns: list[str] = []
+        if dataset in ("load", "forecast"):
+            report = MISOMarketReport.FORECAST_AND_LOAD
+            parse_fn = self.parse_forecast_and_load_market_report
+            drop_columns = ["forecast" if dataset == "load" else "load"]
+        elif dataset == "fuel_mix":
+            report = MISOMarketReport.GENERATION_FUEL_MIX
+            parse_fn = self.parse_generation_fuel_mix_market_report
+        elif dataset == "realtime_lmp":
+            report = MISOMarketReport.REALTIME_EXANTE_LMP
+            parse_fn = self.lmp_report_parser(
+                self.parse_realtime_exante_lmp_market_report, nodes
+            )
+        elif dataset == "dayahead_lmp":
+            report = price_type
+            parse_fn = self.lmp_report_parser(
+                self.parse_dayahead_lmp_market_report, nodes
+            )
+        else:
+            raise ValueError(f'Unknown dataset "{dataset}".')
+
+        async for date, df in reports.iter_market_report_files(
+            self,
+            self.historical_dates(requested),
+            report,
+            parse_fn,
+            compact=compact,
+            on_error=on_error,
+            probe_files=probe_files,
+        ):
+            yield date, df.drop(columns=drop_columns) if drop_columns else df
+
     async def retrieve_and_parse_market_report_files(
         self,
         dates: list[dt.datetime],
         report: MISOMarketReport,
-        parse_fn: Callable[[bytes], pd.DataFrame],
+        parse_fn: Callable[[IO[bytes]], pd.DataFrame],
+        compact: bool = False,
+        probe_files: bool = True,
     ) -> pd.DataFrame:
+        """
+        Download and parse the report files for "dates" and combine them
+        into a single dataframe (see
+        "powerviz.reports.iter_market_report_files").
+        """
 
-        dates = [self.to_native_tz(date) for date in dates]
-        urls_dict: dict[dt.datetime, str] = (
-            await self.get_all_market_report_urls(dates, report)
-        )
-
-        # set of all expected market report file names
-        # non-archived market report file names included as is.
-        # names of archived market report files are included as
-        # if they are unarchived/unzipped.
-        # this is done to avoided parsing un-requested files
-        # which are also present inside the archive/zip file
-        # e.g. this happens when requesting a partial month
-        # of archived data
-        # will remove file names from set as they are retrieved
-        # and warn user of any unretrieved files at end
-        unretrieved_files = {
-            self.market_report_filename(date, report, is_archived=False)
-            for date in urls_dict.keys()
-        }
-
-        dfs: list[pd.DataFrame] = []
-        urls = set(urls_dict.values())
-        with tqdm.tqdm(
-            total=len(unretrieved_files),
-            desc="Retrieving/Parsing market report files",
-        ) as progress_bar:
-            for coro in asyncio.as_completed(
-                [self._fetch(url) for url in urls]
-            ):
-                resp: aiohttp.ClientResponse = await coro
-                filename = str(resp.url).rsplit("/", maxsplit=1)[-1]
-                ext = filename.rsplit(".", maxsplit=1)[-1]
-
-                file_data: bytes
-                async with resp:
-                    file_data = await resp.read()
-
-                if ext == "zip":
-                    with ZipFile(io.BytesIO(file_data), mode="r") as zfile:
-                        for file in zfile.filelist:
-                            filename = file.filename
-                            if filename in unretrieved_files:
-                                file_data = zfile.read(filename)
-
-                                dfs.append(parse_fn(file_data))
-                                unretrieved_files.remove(filename)
-                                progress_bar.update(1)
-
-                else:
-                    assert filename in unretrieved_files
-
-                    dfs.append(parse_fn(file_data))
-                    unretrieved_files.remove(filename)
-                    progress_bar.update(1)
-
-        if len(unretrieved_files) > 0:
-            warnings.warn(
-                (
-                    "Not all market report files retrieved. "
-                    f"Missing:\n{list(unretrieved_files)}"
-                )
+        dfs = [
+            df
+            async for _, df in reports.iter_market_report_files(
+                self,
+                dates,
+                report,
+                parse_fn,
+                compact=compact,
+                probe_files=probe_files,
             )
-
-        # combine all dataframes and sort
-        # sorting rows by order of columns
-        # i.e. expecting "Start"/"End" (date) columns to be first
-        df = pd.concat(dfs)
-        df = df.sort_values(
-            by=df.columns.tolist(), ascending=True, ignore_index=True
-        )
-        return df
+        ]
+        return reports.combine_market_reports(self, dfs, compact)
 
     async def get_all_market_report_urls(
         self,
         dates: list[dt.datetime],
         report: MISOMarketReport,
+        on_error: Optional[Callable[[dt.datetime, Exception], None]] = None,
     ) -> dict[dt.datetime, str]:
-        dates = [self.to_native_tz(date) for date in dates]
-        urls = await tqdm_asyncio.gather(
-            *[self.market_report_url(d, report) for d in dates],
-            desc="Retrieving market report file urls",
-        )
-        urls_dict = {
-            date: url for date, url in zip(dates, urls) if url is not None
-        }
-
-        missing_dates = [
-            date.isoformat() for date, url in zip(dates, urls) if url is None
-        ]
-        if len(missing_dates) > 0:
-            warnings.warn(
-                (
-                    "Not all requested data is available. "
-                    f"The following dates are missing:\n{missing_dates}"
-                )
-            )
+        """
+        Urls of the report files (or monthly archives) for "dates".
+        Failed url lookups are raised, or if "on_error" is given,
+        reported for each date of the failed month and skipped.
+        """
 
-        return urls_dict
+        return await reports.get_all_market_report_urls(
+            self, dates, report, on_error=on_error
+        )
 
     async def market_report_url(
         self, date: dt.datetime, report: MISOMarketReport
@@ -742,32 +764,134 @@ class MISOClient(BaseClient):
         If neither file exists, return None.
         """
 
-        BASE_URL = (  # pylint: disable=invalid-name
-            "https://docs.misoenergy.org/marketreports"
-        )
-
         date = self.to_native_tz(date)
+        urls = await reports.market_report_month_urls(self, [date], report)
+        self.url_index.save()
+        return urls[date]
 
-        # check if non-archived url exists
-        non_archived_url = self.urljoin(
-            BASE_URL,
-            self.market_report_filename(date, report, is_archived=False),
-        )
-        # return non-archived url if exists
-        if await self.check_url_exists(non_archived_url):
-            return non_archived_url
-
-        # check if archived url exists
-        archived_url = self.urljoin(
-            BASE_URL,
-            self.market_report_filename(date, report, is_archived=True),
-        )
-        # return archived url if exists
-        if await self.check_url_exists(archived_url):
-            return archived_url
+    def endpoint(self, url: str) -> str:
+        """
+        Label market report urls by report type (and archived or not),
+        api urls by message type.
+        """
+
+        split_url = urllib.parse.urlsplit(url)
+        query = urllib.parse.parse_qs(split_url.query)
+        if "messageType" in query:
+            return f"api/{query['messageType'][0]}"
+
+        filename = split_url.path.rsplit("/", maxsplit=1)[-1]
+        if url.startswith(self.MARKET_REPORTS_URL):
+            for report in MISOMarketReport:
+                for is_archived in (False, True):
+                    # report file names only differ by date prefix
+                    report_filename = self.market_report_filename(
+                        dt.datetime(2000, 1, 1), report, is_archived
+                    )
+                    suffix = report_filename.split("_", maxsplit=1)[-1]
+                    if filename.endswith(f"_{suffix}"):
+                        kind = "archive" if is_archived else "daily"
+                        return f"marketreports/{report.name}/{kind}"
+
+        return super().endpoint(url)
+
+    def expand(
+        self, df: pd.DataFrame, interval: Optional[pd.Timedelta] = None
+    ) -> pd.DataFrame:
+        """
+        Default representation of a compact dataframe ("compact=True"),
+        see "powerviz.compact.expand_frame".
+        """
+
+        return expand_frame(df, self.node_catalog, interval)
+
+    def requested_dates(
+        self,
+        dates: Optional[Dates],
+        start: Optional[dt.datetime],
+        end: Optional[dt.datetime],
+    ) -> tuple[Dates, bool]:
+        """
+        Requested "dates", or the market dates from "start" to "end"
+        (inclusive, like "pd.date_range"), and whether report file urls
+        need to be probed per date (ranges are planned from file names,
+        see "powerviz.reports.plan_market_report_range").
+        """
 
-        # if neither url exists, return None
-        return None
+        if start is None and end is None:
+            if dates is None:
+                raise DatesTypeError()
+            return dates, True
+
+        if dates is not None or start is None or end is None:
+            raise DatesTypeError(
+                'Request either "dates" or both "start" and "end".'
+            )
+
+        tz = pytz.timezone(self.TIMEZONE)
+        first = self.to_native_tz(start).date()
+        last = self.to_native_tz(end).date()
+        return [
+            tz.localize(dt.datetime.combine(first, dt.time()))
+            + dt.timedelta(days=i)
+            for i in range((last - first).days + 1)
+        ], False
+
+    @staticmethod
+    def historical_dates(dates: Dates) -> list[dt.datetime]:
+        if not (
+            isinstance(dates, list)
+            and all(isinstance(date, dt.datetime) for date in dates)
+        ):
+            raise DatesTypeError('"dates" must be a list of datetimes.')
+        return dates
+
+    def lmp_report_parser(
+        self,
+        parse_fn: Callable[..., pd.DataFrame],
+        nodes: Nodes = "hubs",
+    ) -> Callable[[IO[bytes]], pd.DataFrame]:
+        """
+        LMP report parser "parse_fn" keeping "nodes". Files parsed in
+        the event loop are encoded with "node_catalog" right away, files
+        parsed in worker processes are encoded as they arrive (the
+        catalog isn't shared with workers, see
+        "powerviz.reports.encode_market_report").
+        """
+
+        keywords: dict[str, Any] = {"nodes": self.normalize_nodes(nodes)}
+        if self.parse_inline:
+            keywords["node_catalog"] = self.node_catalog
+        return functools.partial(parse_fn, **keywords)
+
+    @classmethod
+    def normalize_nodes(cls, nodes: Nodes) -> Nodes:
+        """
+        Validated node selection with a stable representation
+        (lists of nodes are sorted), see
+        "powerviz.reports.parser_version".
+        """
+
+        cls.node_filter(nodes)
+        if isinstance(nodes, re.Pattern) or nodes in ("hubs", "all"):
+            return nodes
+        return tuple(sorted(set(nodes)))
+
+    @classmethod
+    def node_filter(cls, nodes: Nodes) -> NodeFilter:
+        if isinstance(nodes, re.Pattern):
+            return nodes
+        if nodes == "hubs":
+            return frozenset(cls.HUB_NAMES)
+        if nodes == "all":
+            return None
+        if (
+            isinstance(nodes, Sequence)
+            and not isinstance(nodes, str)
+            and all(isinstance(node, str) for node in nodes)
+        ):
+            return frozenset(nodes)
+        raise NodesTypeError()
 
     def market_report_filename(
         self,
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from powerviz.cache import write_json
+
+NodeFilter = frozenset[str] | re.Pattern[str] | None  # None keeps all nodes
+
+
+def node_filter_fn(
+    node_filter: NodeFilter,
+) -> Callable[[object], bool] | None:
+    """
+    Per node name predicate (for filtering rows while reading files).
+    Pattern results are memoized per name, since names repeat for
+    every interval.
+    """
+
+    if node_filter is None:
+        return None
+    if isinstance(node_filter, frozenset):
+        return node_filter.__contains__
+
+    pattern = node_filter
+    matches: dict[object, bool] = {}
+
+    def keep(name: object) -> bool:
+        if name not in matches:
+            matches[name] = (
+                isinstance(name, str) and pattern.search(name) is not None
+            )
+        return matches[name]
+
+    return keep
+
+
+def node_mask(names: pd.Series, node_filter: NodeFilter) -> pd.Series:
+    """
+    Vectorized node filter, boolean mask of rows to keep.
+    """
+
+    if node_filter is None:
+        return pd.Series(True, index=names.index)
+    if isinstance(node_filter, frozenset):
+        return names.isin(node_filter)
+    return names.astype(str).str.contains(node_filter, regex=True)
+
+
+class NodeCatalog:
+    """
+    Stable, append-only dictionary of node names shared by all parsed
+    LMP dataframes of a client.
+
+    Node columns are encoded as categoricals with the catalog's
+    categories, so dataframes of many days (and nodes) concatenate
+    without falling back to object dtype. Codes never change once
+    assigned, so nodes can be filtered by integer code
+    (e.g. "df[df['node'].cat.codes == catalog.code(name)]").
+
+    If "path" is given, the catalog is loaded from and saved to a json
+    file, keeping codes stable across sessions.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[str] = (),
+        path: Optional[str | os.PathLike[str]] = None,
+    ) -> None:
+        self.path = (
+            os.path.expanduser(os.fspath(path)) if path is not None else None
+        )
+
+        self._names: list[str] = []
+        self._codes: dict[str, int] = {}
+        self._dtype: pd.CategoricalDtype | None = None
+        self._dirty = False
+
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                self.add(json.load(file))
+            self._dirty = False
+        self.add(nodes)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._codes
+
+    @property
+    def dtype(self) -> pd.CategoricalDtype:
+        if self._dtype is None:
+            self._dtype = pd.CategoricalDtype(categories=self._names)
+        return self._dtype
+
+    def add(self, names: Iterable[str]) -> None:
+        for name in names:
+            if name not in self._codes:
+                self._codes[name] = len(self._names)
+                self._names.append(name)
+                self._dtype = None
+                self._dirty = True
+
+    def code(self, name: str) -> int:
+        return self._codes[name]
+
+    def codes(self, names: Iterable[str]) -> np.ndarray:
+        return np.array([self._codes[name] for name in names], dtype=np.int32)
+
+    def encode(self, names: pd.Series) -> pd.Series:
+        """
+        Encode node names (strings or categorical) with the catalog's
+        categories, adding unseen names.
+        """
+
+        self._add_unique(names)
+        return self._recode(names)
+
+    def unify(self, dfs: list[pd.DataFrame], col: str) -> list[pd.DataFrame]:
+        """
+        Encode "col" of all dataframes with the same (final) categories,
+        so concatenating them keeps the categorical dtype.
+        """
+
+        for df in dfs:
+            self._add_unique(df[col])
+        return [df.assign(**{col: self._recode(df[col])}) for df in dfs]
+
+    def _recode(self, names: pd.Series) -> pd.Series:
+        # unordered categoricals with the same categories in a different
+        # order compare equal, so "astype" would keep the original codes
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            return names.cat.set_categories(self.dtype.categories)
+        return names.astype(self.dtype)
+
+    def _add_unique(self, names: pd.Series) -> None:
+        uniques = (
+            names.cat.categories
+            if isinstance(names.dtype, pd.CategoricalDtype)
+            else names.unique()
+        )
+        self.add(name for name in uniques if name not in self._codes)
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+
+        write_json(self.path, self._names)
+        self._dirty = False
+
+
+def encode_nodes(
+    names: pd.Series, node_catalog: Optional[NodeCatalog]
+) -> pd.Series:
+    """
+    Node names as a categorical with "node_catalog"'s categories, or
+    with the (sorted) names only if there is no catalog (e.g. parsing
+    in worker processes, frames are encoded with the client's catalog
+    when they arrive).
+    """
+
+    if node_catalog is None:
+        return names.astype(pd.CategoricalDtype())
+    return node_catalog.encode(names)
@@ -0,0 +1,438 @@
+"""
+Parsers of MISO api responses and market report files, the
+"MISOClient.parse_*" methods.
+
+Report file parsers only use class attributes of the client (they run
+in worker processes when parsing in a pool, see
+"BaseClient._parse_file_data").
+"""
+
+import datetime as dt
+import io
+import operator
+from typing import IO, TYPE_CHECKING, Any, Optional
+
+import numpy as np
+import pandas as pd
+from python_calamine import CalamineWorkbook
+
+from powerviz.base import json_object
+from powerviz.nodes import NodeCatalog, encode_nodes, node_filter_fn, node_mask
+from powerviz.types import Nodes
+
+if TYPE_CHECKING:
+    from powerviz.miso import MISOClient
+
+
+def parse_load_api_data(
+    client: "MISOClient", json_data: bytes | str | dict[str, Any]
+) -> pd.DataFrame:
+    """
+    "json_data" is the load api response, raw or decoded.
+    """
+
+    load_json = json_object(json_data)
+
+    refid_str = load_json["LoadInfo"]["RefId"]
+    date = client.parse_api_refid_datetime(refid_str).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+
+    # one record per interval ("{hour}:{minute}" times), converted
+    # column-wise (numpy arrays, api responses are small so pandas
+    # overhead would dominate)
+    records_df = pd.DataFrame.from_records(
+        record["Load"] for record in load_json["LoadInfo"]["FiveMinTotalLoad"]
+    )
+    hours, _, minutes = np.char.partition(
+        records_df["Time"].to_numpy(dtype=str), ":"
+    ).T
+    offsets = (60 * hours.astype(int) + minutes.astype(int)).astype(
+        "timedelta64[m]"
+    )
+    loads = records_df["Value"].to_numpy(dtype=float)
+
+    order = np.argsort(offsets, kind="stable")
+    start = client.to_native_tz_series(
+        pd.Series(
+            (np.datetime64(date, "m") + offsets[order]).astype(
+                "datetime64[us]"
+            )
+        )
+    )
+    load_df = pd.DataFrame(
+        {
+            "start": start,
+            "end": start + dt.timedelta(minutes=5),
+            "load": loads[order].round(2),
+        }
+    )
+    return load_df
+
+
+def parse_forecast_and_load_market_report(
+    client: type["MISOClient"], xls_file: IO[bytes]
+) -> pd.DataFrame:
+    forecast_load_df = pd.read_excel(
+        xls_file,
+        skiprows=[0, 1, 2, 3, 5],  # skip date and title
+        nrows=24,  # only read current day (skip future forecasts)
+        engine="calamine",  # type: ignore [call-overload]
+    )
+
+    use_cols = [
+        "Market Day",
+        "HourEnding",
+        "MISO MTLF (MWh)",
+        "MISO ActualLoad (MWh)",
+    ]
+    new_cols = [
+        "start",
+        "end",
+        "forecast",
+        "load",
+    ]
+
+    forecast_load_df = forecast_load_df[use_cols].rename(
+        columns=dict(zip(use_cols, new_cols))
+    )
+
+    forecast_load_df["start"] = client.to_native_tz_series(
+        pd.to_datetime(forecast_load_df["start"])
+        + pd.to_timedelta(forecast_load_df["end"] - 1, unit="hours")
+    )
+    forecast_load_df["end"] = forecast_load_df["start"] + dt.timedelta(hours=1)
+    forecast_load_df["forecast"] = (
+        forecast_load_df["forecast"].astype(float).round(2)
+    )
+    forecast_load_df["load"] = forecast_load_df["load"].astype(float).round(2)
+
+    forecast_load_df = forecast_load_df.sort_values(
+        by="start", ascending=True, ignore_index=True
+    )
+
+    return forecast_load_df
+
+
+def parse_forecast_api_data(
+    client: "MISOClient", json_data: bytes | str | dict[str, Any]
+) -> pd.DataFrame:
+    """
+    "json_data" is the load api response, raw or decoded.
+    """
+
+    forecast_json = json_object(json_data)
+
+    refid_str = forecast_json["LoadInfo"]["RefId"]
+    date = client.parse_api_refid_datetime(refid_str).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+
+    # one record per hour ending, converted column-wise
+    records_df = pd.DataFrame.from_records(
+        record["Forecast"]
+        for record in forecast_json["LoadInfo"]["MediumTermLoadForecast"]
+    )
+    hours = (records_df["HourEnding"].to_numpy(dtype=int) - 1).astype(
+        "timedelta64[h]"
+    )
+    forecasts = records_df["LoadForecast"].to_numpy(dtype=float)
+
+    order = np.argsort(hours, kind="stable")
+    start = client.to_native_tz_series(
+        pd.Series(
+            (np.datetime64(date, "h") + hours[order]).astype("datetime64[us]")
+        )
+    )
+    forecast_df = pd.DataFrame(
+        {
+            "start": start,
+            "end": start + dt.timedelta(hours=1),
+            "forecast": forecasts[order].round(2),
+        }
+    )
+    return forecast_df
+
+
+def parse_fuel_mix_api_data(
+    client: "MISOClient", json_data: bytes | str | dict[str, Any]
+) -> pd.DataFrame:
+    """
+    "json_data" is the fuel mix api response, raw or decoded.
+    """
+
+    fuel_mix_json = json_object(json_data)
+
+    refid_str = fuel_mix_json["RefId"]
+    start = client.parse_api_refid_datetime(refid_str)
+
+    # one record per fuel type, converted column-wise
+    records_df = pd.DataFrame.from_records(fuel_mix_json["Fuel"]["Type"])
+    fuel_types = np.char.replace(
+        np.char.lower(records_df["CATEGORY"].to_numpy(dtype=str)), " ", "_"
+    )
+    fuel_mws = records_df["ACT"].to_numpy(dtype=float).round(2)
+
+    # all fuels share the refid interval
+    for datetime_str in records_df["INTERVALEST"].unique():
+        datetime = client.to_native_tz(
+            dt.datetime.strptime(datetime_str, "%Y-%m-%d %I:%M:%S %p")
+        )
+        assert datetime == start
+
+    fuel_mix_df = pd.DataFrame(
+        {
+            "start": [start],
+            "end": [start + dt.timedelta(minutes=5)],
+            **dict(zip(fuel_types.tolist(), fuel_mws[:, np.newaxis])),
+            "total": [round(float(fuel_mix_json["TotalMW"]), 2)],
+        }
+    )
+    return fuel_mix_df
+
+
+def parse_generation_fuel_mix_market_report(
+    client: type["MISOClient"], xlsx_file: IO[bytes]
+) -> pd.DataFrame:
+    fuel_mix_df = pd.read_excel(
+        xlsx_file,
+        sheet_name="RT Generation Fuel Mix",
+        nrows=28,  # include date and title for parsing date
+        engine="calamine",  # type: ignore [call-overload]
+    )
+
+    date = dt.datetime.strptime(
+        fuel_mix_df.iloc[1, 0], "Market Date: %Y-%m-%d"
+    )
+
+    header_row = 3
+    fuel_mix_df.columns = fuel_mix_df.iloc[header_row].values
+
+    # skip regional data (only keep whole miso data)
+    # miso data start at "HE" (hour ending) col
+    miso_start_col = fuel_mix_df.columns.get_loc("HE")
+    fuel_mix_df = fuel_mix_df.iloc[header_row + 1 :, miso_start_col:]
+
+    new_cols = {
+        "HE": "start",
+        "Gas": "natural_gas",
+        "MISO": "total",
+    }
+    new_cols |= {
+        col: col.lower() for col in fuel_mix_df.columns if col not in new_cols
+    }
+    fuel_mix_df = fuel_mix_df.rename(columns=new_cols)
+
+    fuel_mix_df["start"] = client.to_native_tz_series(
+        date + pd.to_timedelta(fuel_mix_df["start"] - 1, unit="hour")
+    )
+    fuel_mix_df["end"] = fuel_mix_df["start"] + dt.timedelta(hours=1)
+    for col in fuel_mix_df.columns:
+        if col not in ("start", "end"):
+            fuel_mix_df[col] = fuel_mix_df[col].astype(float).round(2)
+
+    sort_cols = (
+        ["start", "end"]
+        + [
+            col
+            for col in fuel_mix_df.columns
+            if col not in ("start", "end", "other", "total")
+        ]
+        + ["other", "total"]
+    )
+    fuel_mix_df = fuel_mix_df[sort_cols].sort_values(
+        by="start", ascending=True, ignore_index=True
+    )
+    return fuel_mix_df
+
+
+def parse_realtime_expost_lmp_api_data(
+    client: "MISOClient", csv_data: bytes, nodes: Nodes = "hubs"
+) -> pd.DataFrame:
+    lmp_df = pd.read_csv(io.BytesIO(csv_data))
+
+    use_cols = [
+        "INTERVAL",
+        "CPNODE",
+        "LMP",
+        "MLC",
+        "MCC",
+    ]
+    new_cols = [
+        "start",
+        "node",
+        "lmp",
+        "mlc",
+        "mcc",
+    ]
+    lmp_df = lmp_df[use_cols].rename(columns=dict(zip(use_cols, new_cols)))
+
+    lmp_df = lmp_df[node_mask(lmp_df["node"], client.node_filter(nodes))]
+
+    lmp_df["start"] = client.to_native_tz_series(lmp_df["start"])
+    lmp_df["node"] = client.node_catalog.encode(lmp_df["node"])
+    lmp_df["lmp"] = lmp_df["lmp"].astype(float).round(2)
+    lmp_df["mlc"] = lmp_df["mlc"].astype(float).round(2)
+    lmp_df["mcc"] = lmp_df["mcc"].astype(float).round(2)
+    lmp_df["end"] = lmp_df["start"] + dt.timedelta(minutes=5)
+
+    cols_order = [
+        "start",
+        "end",
+        "node",
+        "lmp",
+        "mlc",
+        "mcc",
+    ]
+    lmp_df = lmp_df[cols_order].sort_values(
+        by=["start", "node"], ascending=True, ignore_index=True
+    )
+    return lmp_df
+
+
+def parse_realtime_exante_lmp_market_report(
+    client: type["MISOClient"],
+    xlsx_file: IO[bytes],
+    nodes: Nodes = "hubs",
+    node_catalog: Optional[NodeCatalog] = None,
+) -> pd.DataFrame:
+    """
+    Largest report file (all nodes, 5-min intervals), usually only
+    a few nodes are kept. Rows are filtered while iterating over the
+    sheet and only the used columns of kept rows are converted to a
+    dataframe (instead of reading the whole sheet with
+    "pd.read_excel").
+
+    Nodes are encoded with "node_catalog" if given (see
+    "MISOClient.lmp_report_parser").
+    """
+
+    use_cols = [
+        "Time (EST)",
+        "CP Node",
+        "RT Ex-Ante LMP",
+        "RT Ex-Ante MLC",
+        "RT Ex-Ante MCC",
+    ]
+    new_cols = [
+        "start",
+        "node",
+        "lmp",
+        "mlc",
+        "mcc",
+    ]
+
+    workbook = CalamineWorkbook.from_filelike(xlsx_file)
+    rows = workbook.get_sheet_by_index(0).iter_rows()
+
+    # skip date and description
+    for _ in range(3):
+        next(rows)
+    header: list[Any] = next(rows)
+
+    get_cols = operator.itemgetter(*map(header.index, use_cols))
+    node_col = header.index("CP Node")
+    keep_node = node_filter_fn(client.node_filter(nodes))
+
+    # footer (warning) has no node
+    lmp_df = pd.DataFrame(
+        (
+            [get_cols(row) for row in rows if row[node_col] != ""]
+            if keep_node is None
+            else [get_cols(row) for row in rows if keep_node(row[node_col])]
+        ),
+        columns=new_cols,
+    )
+
+    lmp_df["start"] = client.to_native_tz_series(lmp_df["start"])
+    lmp_df["node"] = encode_nodes(lmp_df["node"], node_catalog)
+    lmp_df["lmp"] = lmp_df["lmp"].astype(float).round(2)
+    lmp_df["mlc"] = lmp_df["mlc"].astype(float).round(2)
+    lmp_df["mcc"] = lmp_df["mcc"].astype(float).round(2)
+    lmp_df["end"] = lmp_df["start"] + dt.timedelta(minutes=5)
+
+    cols_order = [
+        "start",
+        "end",
+        "node",
+        "lmp",
+        "mlc",
+        "mcc",
+    ]
+    lmp_df = lmp_df[cols_order].sort_values(
+        by=["start", "node"], ascending=True, ignore_index=True
+    )
+    return lmp_df
+
+
+def parse_dayahead_lmp_market_report(
+    client: type["MISOClient"],
+    csv_file: IO[bytes],
+    nodes: Nodes = "hubs",
+    node_catalog: Optional[NodeCatalog] = None,
+) -> pd.DataFrame:
+    """
+    Report has one row per node and value type (LMP/MLC/MCC) with
+    24 hour ending columns. Each value type block is aligned by node
+    and flattened hour by hour, so rows come out sorted by start
+    and node without reshaping (melt/pivot) the whole table.
+
+    Nodes are encoded with "node_catalog" if given (see
+    "MISOClient.lmp_report_parser").
+    """
+
+    # skip title, date, blank line and description
+    _ = csv_file.readline()
+    date_str = csv_file.readline().decode().strip("\n\r ")
+    date = dt.datetime.strptime(date_str, "%m/%d/%Y")
+    _ = csv_file.readline()
+    _ = csv_file.readline()
+
+    hour_cols = [f"HE {hour}" for hour in range(1, 25)]
+    lmp_df = pd.read_csv(
+        csv_file,
+        usecols=["Node", "Value", *hour_cols],
+        engine=client.CSV_ENGINE,
+    )
+
+    lmp_df = lmp_df[node_mask(lmp_df["Node"], client.node_filter(nodes))]
+
+    # nodes in category order
+    uniques = lmp_df["Node"].unique()
+    node_dtype = encode_nodes(pd.Series(uniques), node_catalog).dtype
+    (node_codes,) = np.nonzero(node_dtype.categories.isin(uniques))
+    node_names = node_dtype.categories[node_codes]
+    node_count = len(node_names)
+
+    # (node, hour) block per value type, flattened hour major
+    values: dict[str, np.ndarray] = {}
+    for value in ("LMP", "MLC", "MCC"):
+        value_df = lmp_df[lmp_df["Value"] == value].set_index("Node")
+        values[value.lower()] = (
+            value_df[hour_cols]
+            .reindex(node_names)
+            .to_numpy(dtype=float)
+            .T.ravel()
+            .round(2)
+        )
+
+    # hour ending columns -> interval start
+    hours = np.repeat(np.arange(len(hour_cols)), node_count)
+    start = client.to_native_tz_series(
+        pd.Series(date + pd.to_timedelta(hours, unit="hours"))
+    )
+
+    lmp_df = pd.DataFrame(
+        {
+            "start": start,
+            "end": start + dt.timedelta(hours=1),
+            "node": pd.Categorical.from_codes(
+                np.tile(node_codes, len(hour_cols)),
+                dtype=node_dtype,
+            ),
+            **values,
+        }
+    )
+    # unnamed columns, like the other report parsers
+    lmp_df.columns.name = None
+    return lmp_df
@@ -0,0 +1,938 @@
+"""
+Historical market report files of a "MISOClient": resolving and
+planning downloads (daily files or monthly archives), downloading,
+reading and parsing them pipelined, and caching parsed reports.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import datetime as dt
+import functools
+import hashlib
+import inspect
+import warnings
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Literal,
+    Optional,
+)
+from zipfile import BadZipFile, ZipFile
+
+import aiohttp
+import pandas as pd
+import pytz
+import tqdm
+from tqdm.asyncio import tqdm_asyncio
+
+from powerviz.compact import compact_frame
+from powerviz.merge import key_columns, merge_sorted
+
+if TYPE_CHECKING:
+    from powerviz.miso import MISOClient, MISOMarketReport
+
+OnDateError = Callable[[dt.datetime, Exception], None]
+# starts parsing a report file (by name) from its (future) contents
+ParseFileFn = Callable[
+    [str, Awaitable[bytes | IO[bytes]]], "asyncio.Task[None]"
+]
+
+
+@dataclasses.dataclass
+class MarketReportDownload:
+    """
+    Report file or monthly archive to download, and the report files
+    (archive members) to parse from it.
+    """
+
+    url: str
+    immutable: bool
+    filenames: list[str]
+    # url was resolved by probing (see "plan_market_report_range"),
+    # unprobed urls which don't exist are reported as missing
+    probed: bool = True
+
+
+async def iter_market_report_files(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    parse_fn: Callable[[IO[bytes]], pd.DataFrame],
+    compact: bool = False,
+    on_error: Optional[OnDateError] = None,
+    probe_files: bool = True,
+) -> AsyncIterator[tuple[dt.datetime, pd.DataFrame]]:
+    """
+    Download and parse the report files for "dates", yielding each
+    market date's parsed dataframe as soon as it is ready (in no
+    particular order).
+    Files are parsed in the client's parse executor, so "parse_fn"
+    must be picklable (e.g. a classmethod, see
+    "BaseClient._parse_file_data").
+
+    Node columns are encoded with the client's "node_catalog" and
+    "compact" compacts each parsed file as it arrives (see
+    "powerviz.compact").
+
+    Memory and disk use stay bounded if the consumer falls behind
+    (e.g. while writing dataframes to disk), see
+    "MarketReportPipeline".
+
+    Failed downloads and parses are raised, or if "on_error" is
+    given, reported per market date and skipped.
+
+    Without "probe_files", downloads are planned from file names
+    instead of probing each date (see "plan_market_report_range").
+    """
+
+    dates = [client.to_native_tz(date) for date in dates]
+
+    # archives and files for old market dates never change
+    finalized_before = (
+        dt.datetime.now(pytz.timezone(client.TIMEZONE))
+        - client.REPORT_FINALIZED_AFTER
+    )
+
+    # finalized reports may already be parsed and cached
+    version = parser_version(client, parse_fn)
+    cached_dates = cached_market_report_dates(
+        client, dates, report, version, finalized_before
+    )
+    dates = [date for date in dates if date not in cached_dates]
+
+    file_dates, planned = await (
+        plan_market_report_downloads(
+            client, dates, report, finalized_before, on_error=on_error
+        )
+        if probe_files
+        else plan_market_report_range(client, dates, report, finalized_before)
+    )
+
+    pipeline = MarketReportPipeline(
+        client, report, parse_fn, version, file_dates, on_error=on_error
+    )
+    removed_dates: list[dt.datetime] = []
+    async with contextlib.aclosing(
+        pipeline.run(planned, cached_dates, finalized_before)
+    ) as results:
+        async for date, df in results:
+            if df is None:
+                # removed from the cache since checked (e.g. pruned),
+                # downloaded once the other files are retrieved
+                removed_dates.append(date)
+                continue
+            yield date, encode_market_report(client, df, compact)
+
+    client.node_catalog.save()
+    warn_missing_market_reports(pipeline.unretrieved)
+
+    if len(removed_dates) > 0:
+        async for date, df in iter_market_report_files(
+            client,
+            removed_dates,
+            report,
+            parse_fn,
+            compact,
+            on_error,
+            probe_files,
+        ):
+            yield date, df
+
+
+class MarketReportPipeline:  # pylint: disable=too-many-instance-attributes
+    """
+    Downloads, reads and parses planned report files for
+    "iter_market_report_files".
+
+    Downloading and parsing are pipelined: a download slot is taken
+    before downloading each file and released once the file is read
+    (or parsed, when parsing in the event loop straight from the file),
+    holding back downloads if parsing falls behind, so at most
+    "DOWNLOAD_SLOTS" files are downloading or waiting to be read.
+    "2 * parse_workers" (at least 2) report files are read, parsed or
+    waiting to be consumed at a time, enough to keep all parse workers
+    busy.
+    """
+
+    def __init__(
+        self,
+        client: "MISOClient",
+        report: "MISOMarketReport",
+        parse_fn: Callable[[IO[bytes]], pd.DataFrame],
+        version: str,
+        file_dates: dict[str, dt.datetime],
+        on_error: Optional[OnDateError] = None,
+    ) -> None:
+        self.client = client
+        self.report = report
+        self.parse_fn = parse_fn
+        self.version = version
+        self.file_dates = file_dates
+        self.on_error = on_error
+
+        # report file names not retrieved (yet), the rest are missing
+        self.unretrieved = set(file_dates)
+
+        queue_size = 2 * max(1, client.parse_workers)
+        self._download_slots = asyncio.Semaphore(
+            max(queue_size, client.DOWNLOAD_SLOTS)
+        )
+        self._downloads: asyncio.Queue[
+            tuple[MarketReportDownload, IO[bytes] | Exception]
+        ] = asyncio.Queue()
+        self._parse_slots = asyncio.Semaphore(queue_size)
+
+        # parsed dataframes (or errors), None once all files are parsed
+        self._parsed: asyncio.Queue[
+            tuple[dt.datetime, pd.DataFrame] | BaseException | None
+        ] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def run(
+        self,
+        planned: list[MarketReportDownload],
+        cached_dates: list[dt.datetime],
+        finalized_before: dt.datetime,
+    ) -> AsyncGenerator[tuple[dt.datetime, pd.DataFrame | None], None]:
+        """
+        Parsed reports of "cached_dates" (read while the "planned" files
+        download, None if removed from "parsed_cache"), then the parsed
+        report files as they are ready. Reports of dates before
+        "finalized_before" are added to "parsed_cache".
+        """
+
+        progress_bar = tqdm.tqdm(
+            total=len(self.unretrieved),
+            desc="Retrieving/Parsing market report files",
+        )
+        self._tasks.extend(
+            asyncio.create_task(self._download(download))
+            for download in planned
+        )
+        self._tasks.append(
+            asyncio.create_task(
+                self._retrieve(len(planned), finalized_before, progress_bar)
+            )
+        )
+        try:
+            with progress_bar:
+                async for date, cached_df in iter_cached_market_reports(
+                    self.client, cached_dates, self.report, self.version
+                ):
+                    yield date, cached_df
+
+                while (result := await self._parsed.get()) is not None:
+                    if isinstance(result, BaseException):
+                        raise result
+                    yield result
+                    self._parse_slots.release()
+
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def _download(self, download: MarketReportDownload) -> None:
+        """
+        Download a planned file and put it (or error) in the downloads
+        queue. A slot is acquired before downloading (released by the
+        reader once the file is read, see "_read_files").
+        """
+
+        await self._download_slots.acquire()
+        try:
+            # pylint: disable-next=protected-access
+            file = await self.client._fetch_file(
+                download.url, immutable=download.immutable
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            self._downloads.put_nowait((download, err))
+            return
+        except BaseException:
+            self._download_slots.release()
+            raise
+        self._downloads.put_nowait((download, file))
+
+    async def _retrieve(
+        self,
+        count: int,
+        finalized_before: dt.datetime,
+        progress_bar: tqdm.tqdm,
+    ) -> None:
+        def parse(
+            filename: str, read: Awaitable[bytes | IO[bytes]]
+        ) -> asyncio.Task[None]:
+            task = asyncio.create_task(
+                self._parse(read, filename, finalized_before, progress_bar)
+            )
+            self._tasks.append(task)
+            return task
+
+        parse_tasks: list[asyncio.Task[None]] = []
+        try:
+            async for parse_task in self._read_files(count, parse):
+                parse_tasks.append(parse_task)
+            await asyncio.gather(*parse_tasks)
+        except Exception as err:  # pylint: disable=broad-except
+            self._parsed.put_nowait(err)
+        else:
+            self._parsed.put_nowait(None)
+
+    async def _parse(
+        self,
+        read: Awaitable[bytes | IO[bytes]],
+        filename: str,
+        finalized_before: dt.datetime,
+        progress_bar: tqdm.tqdm,
+    ) -> None:
+        try:
+            # pylint: disable-next=protected-access
+            df = await self.client._parse_file_data(self.parse_fn, await read)
+        except Exception as err:  # pylint: disable=broad-except
+            if self.on_error is None:
+                self._parsed.put_nowait(err)
+                return
+            self.on_error(self.file_dates[filename], err)
+            self._parse_slots.release()
+            return
+        finally:
+            progress_bar.update(1)
+
+        date = self.file_dates[filename]
+        if date < finalized_before:
+            await cache_parsed_market_report(
+                self.client, self.report, date, self.version, df
+            )
+        self._parsed.put_nowait((date, df))
+
+    async def _read_files(
+        self, count: int, parse: ParseFileFn
+    ) -> AsyncIterator[asyncio.Task[None]]:
+        """
+        Read "count" downloaded files, starting a "parse" task (yielded)
+        for each wanted report file (removed from "unretrieved" as they
+        are read) with its name and a future of its contents.
+        Failed downloads (and unreadable archives) are raised, or
+        reported per report file to "on_error" and skipped. Unprobed
+        files which don't exist are skipped.
+
+        Files parsed in a pool are read into memory (archive members
+        are decompressed in threads, zlib releases the GIL), so the
+        members of an archive are read and parsed as independent work
+        units. Files parsed in the event loop are parsed straight from
+        the downloaded file (or archive member), without reading them
+        into memory first. A parse slot is acquired before reading each
+        report file (released once the file is parsed and consumed),
+        and the download's slot is released once all its files are read
+        (or parsed, when parsing straight from the file).
+        """
+
+        for _ in range(count):
+            download, file = await self._downloads.get()
+            try:
+                async with contextlib.aclosing(
+                    self._read_file(download, file, parse)
+                ) as parse_tasks:
+                    async for parse_task in parse_tasks:
+                        yield parse_task
+            finally:
+                self._download_slots.release()
+
+    async def _read_file(
+        self,
+        download: MarketReportDownload,
+        file: IO[bytes] | Exception,
+        parse: ParseFileFn,
+    ) -> AsyncGenerator[asyncio.Task[None], None]:
+        # see "_read_files"
+        if isinstance(file, Exception):
+            # unprobed files may not exist (left in "unretrieved" and
+            # reported as missing)
+            if (
+                not download.probed
+                and isinstance(file, aiohttp.ClientResponseError)
+                and file.status == 404
+            ):
+                return
+            self._fail(download, file)
+            return
+
+        # futures using the file, which is kept open until they're done
+        pending: list[asyncio.Future[Any]] = []
+        with file, contextlib.ExitStack() as archive:
+            try:
+                zfile: Optional[ZipFile] = None
+                members: Optional[set[str]] = None
+                if download.url.endswith(".zip"):
+                    try:
+                        zfile = archive.enter_context(ZipFile(file, mode="r"))
+                    except BadZipFile as err:
+                        self._fail(download, err)
+                        return
+                    members = set(zfile.namelist())
+
+                for filename in download.filenames:
+                    # requested members missing from the archive are
+                    # left in "unretrieved" (reported as missing)
+                    if members is not None and filename not in members:
+                        continue
+
+                    await self._parse_slots.acquire()
+                    self.unretrieved.remove(filename)
+                    if self.client.parse_inline:
+                        # opened (not read) here, read while parsing
+                        read: asyncio.Future[bytes | IO[bytes]] = (
+                            asyncio.get_running_loop().create_future()
+                        )
+                        read.set_result(
+                            archive.enter_context(zfile.open(filename))
+                            if zfile is not None
+                            else file
+                        )
+                        parse_task = parse(filename, read)
+                        pending.append(parse_task)
+                    else:
+                        read = asyncio.ensure_future(
+                            asyncio.to_thread(zfile.read, filename)
+                            if zfile is not None
+                            else asyncio.to_thread(file.read)
+                        )
+                        pending.append(read)
+                        parse_task = parse(filename, read)
+                    yield parse_task
+
+            finally:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _fail(self, download: MarketReportDownload, err: Exception) -> None:
+        if self.on_error is None:
+            raise err
+        for filename in download.filenames:
+            self.unretrieved.discard(filename)
+            self.on_error(self.file_dates[filename], err)
+
+
+def encode_market_report(
+    client: "MISOClient", df: pd.DataFrame, compact: bool = False
+) -> pd.DataFrame:
+    if compact:
+        return compact_frame(df, client.node_catalog)
+    if "node" in df.columns:
+        return df.assign(node=client.node_catalog.encode(df["node"]))
+    return df
+
+
+def warn_missing_market_reports(filenames: set[str]) -> None:
+    if len(filenames) > 0:
+        warnings.warn(
+            (
+                "Not all market report files retrieved. "
+                f"Missing:\n{list(filenames)}"
+            )
+        )
+
+
+def combine_market_reports(
+    client: "MISOClient", dfs: list[pd.DataFrame], compact: bool = False
+) -> pd.DataFrame:
+    # share (final) node categories, so concatenating keeps the
+    # categorical dtype (nodes are ordered by catalog code),
+    # compact dataframes already use catalog codes
+    if not compact and all("node" in df.columns for df in dfs):
+        dfs = client.node_catalog.unify(dfs, "node")
+
+    # combine all dataframes sorted by key ("start", "node")
+    # report files are already sorted by start (and list nodes in
+    # the same order every interval) and cover disjoint time
+    # ranges, so files are concatenated in time order instead of
+    # sorting all rows
+    key = key_columns(dfs[0]) if len(dfs) > 0 else ["start"]
+    return merge_sorted(dfs, key)
+
+
+async def plan_market_report_downloads(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    finalized_before: dt.datetime,
+    on_error: Optional[OnDateError] = None,
+) -> tuple[dict[str, dt.datetime], list[MarketReportDownload]]:
+    """
+    Report file names (as if unarchived) by market date, and the
+    files to download, with dates grouped by monthly archive (each
+    archive is downloaded once and only the requested members are
+    parsed).
+    """
+
+    urls_dict: dict[dt.datetime, str] = (
+        await get_all_market_report_urls(
+            client, dates, report, on_error=on_error
+        )
+        if len(dates) > 0
+        else {}
+    )
+
+    # set of all expected market report file names
+    # non-archived market report file names included as is.
+    # names of archived market report files are included as
+    # if they are unarchived/unzipped.
+    # this is done to avoided parsing un-requested files
+    # which are also present inside the archive/zip file
+    # e.g. this happens when requesting a partial month
+    # of archived data
+    # will remove file names from set as they are retrieved
+    # and warn user of any unretrieved files at end
+    file_dates = {
+        client.market_report_filename(date, report, is_archived=False): date
+        for date in urls_dict.keys()
+    }
+    # archives and files for finalized market dates are immutable
+    downloads: dict[str, MarketReportDownload] = {}
+    for filename, date in file_dates.items():
+        url = urls_dict[date]
+        immutable = url.endswith(".zip") or date < finalized_before
+        if url not in downloads:
+            downloads[url] = MarketReportDownload(url, immutable, [])
+        downloads[url].immutable &= immutable
+        downloads[url].filenames.append(filename)
+
+    return file_dates, list(downloads.values())
+
+
+async def plan_market_report_range(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    finalized_before: dt.datetime,
+) -> tuple[dict[str, dt.datetime], list[MarketReportDownload]]:
+    """
+    Like "plan_market_report_downloads", but without resolving the
+    url of each date: file and archive names follow from
+    "MISOClient.market_report_filename", and only the months around
+    the archive cutoff are probed (see "market_report_archive_cutoff").
+    Archives and daily files are downloaded without probing, files
+    the server doesn't have are reported as missing.
+    """
+
+    # dates by monthly archive, in month order
+    archive_dates: dict[str, list[dt.datetime]] = {}
+    for date in sorted(set(dates)):
+        archive_url = client.urljoin(
+            client.MARKET_REPORTS_URL,
+            client.market_report_filename(date, report, is_archived=True),
+        )
+        archive_dates.setdefault(archive_url, []).append(date)
+
+    archived_months = await market_report_archive_cutoff(
+        client, list(archive_dates.items()), report
+    )
+
+    file_dates: dict[str, dt.datetime] = {}
+    downloads: list[MarketReportDownload] = []
+    for i, (archive_url, month_dates) in enumerate(archive_dates.items()):
+        filenames = [
+            client.market_report_filename(date, report, is_archived=False)
+            for date in month_dates
+        ]
+        file_dates |= zip(filenames, month_dates)
+        # months before the first archive have no archive either
+        if i < archived_months:
+            downloads.append(
+                MarketReportDownload(
+                    archive_url, True, filenames, probed=False
+                )
+            )
+            continue
+        downloads.extend(
+            MarketReportDownload(
+                client.urljoin(client.MARKET_REPORTS_URL, filename),
+                date < finalized_before,
+                [filename],
+                probed=False,
+            )
+            for filename, date in zip(filenames, month_dates)
+        )
+
+    return file_dates, downloads
+
+
+async def get_all_market_report_urls(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    on_error: Optional[OnDateError] = None,
+) -> dict[dt.datetime, str]:
+    """
+    Urls of the report files (or monthly archives) for "dates".
+    Failed url lookups are raised, or if "on_error" is given,
+    reported for each date of the failed month and skipped.
+    """
+
+    dates = [client.to_native_tz(date) for date in dates]
+
+    # group dates by monthly archive, so each archive is probed
+    # once per month instead of once per date
+    archive_dates: dict[str, list[dt.datetime]] = {}
+    for date in dates:
+        archive_dates.setdefault(
+            client.market_report_filename(date, report, is_archived=True),
+            [],
+        ).append(date)
+
+    month_urls: list[dict[dt.datetime, str | None] | Exception] = (
+        await tqdm_asyncio.gather(
+            *[
+                market_report_month_urls(client, month_dates, report)
+                for month_dates in archive_dates.values()
+            ],
+            desc="Retrieving market report file urls",
+            return_exceptions=on_error is not None,
+        )
+    )
+    client.url_index.save()
+
+    urls_by_date: dict[dt.datetime, str | None] = {}
+    for month_dates, urls in zip(archive_dates.values(), month_urls):
+        if isinstance(urls, Exception):
+            assert on_error is not None
+            for date in month_dates:
+                on_error(date, urls)
+            continue
+        urls_by_date |= urls
+    # (in order of "dates", without dates of failed months)
+    urls_dict = {
+        date: url
+        for date in dates
+        if (url := urls_by_date.get(date)) is not None
+    }
+
+    missing_dates = [
+        date.isoformat()
+        for date in dates
+        if date in urls_by_date and urls_by_date[date] is None
+    ]
+    if len(missing_dates) > 0:
+        warnings.warn(
+            (
+                "Not all requested data is available. "
+                f"The following dates are missing:\n{missing_dates}"
+            )
+        )
+
+    return urls_dict
+
+
+async def market_report_month_urls(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+) -> dict[dt.datetime, str | None]:
+    """
+    Resolve report file urls for dates sharing the same monthly
+    archive. Previously resolved dates are looked up in the url
+    index. As for a single date, daily files are probed before the
+    archive: if the first daily file exists, the month isn't
+    archived and only the other daily files are probed. Otherwise
+    the archive is probed once for all remaining dates.
+    """
+
+    urls: dict[dt.datetime, str | None] = {}
+    unresolved_dates: list[dt.datetime] = []
+    for date in dates:
+        entry = client.url_index.get(market_report_key(date, report))
+        if entry is not None:
+            urls[date] = entry.url
+        else:
+            unresolved_dates.append(date)
+
+    if len(unresolved_dates) == 0:
+        return urls
+
+    non_archived_urls = [
+        client.urljoin(
+            client.MARKET_REPORTS_URL,
+            client.market_report_filename(date, report, is_archived=False),
+        )
+        for date in unresolved_dates
+    ]
+
+    # check if the first non-archived url exists
+    first_exists = await client.check_url_exists(non_archived_urls[0])
+    if not first_exists:
+        # check if archived url exists
+        archived_url = client.urljoin(
+            client.MARKET_REPORTS_URL,
+            client.market_report_filename(
+                unresolved_dates[0], report, is_archived=True
+            ),
+        )
+        # archived files never move, so index them permanently
+        if await client.check_url_exists(archived_url):
+            for date in unresolved_dates:
+                urls[date] = archived_url
+                client.url_index.set(
+                    market_report_key(date, report),
+                    archived_url,
+                    permanent=True,
+                )
+            return urls
+
+    # check if the other non-archived urls exist
+    urls_exist = [first_exists] + await asyncio.gather(
+        *[client.check_url_exists(url) for url in non_archived_urls[1:]]
+    )
+    for date, url, url_exists in zip(
+        unresolved_dates, non_archived_urls, urls_exist
+    ):
+        urls[date] = url if url_exists else None
+        client.url_index.set(market_report_key(date, report), urls[date])
+
+    return urls
+
+
+async def market_report_archive_cutoff(
+    client: "MISOClient",
+    months: list[tuple[str, list[dt.datetime]]],
+    report: "MISOMarketReport",
+) -> int:
+    """
+    Number of leading "months" ((archive url, market dates) pairs in
+    month order) before the archive cutoff, i.e. archived or before
+    the first archive. Months after the cutoff have daily report
+    files.
+
+    The latest archive found is kept in the url index, so months up
+    to it are never probed again. A month is probed by its first
+    daily file, then its archive, then a few more of its daily files
+    (so a single missing day doesn't make the month look archived).
+    Months with neither daily files nor an archive are before the
+    cutoff only if an archived month follows them. The cutoff is
+    found by binary search starting at the month after the latest
+    known archive. A plan then usually costs a probe or two, no
+    matter how many months or dates it covers.
+    """
+
+    key = f"{report.name}/latest_archive"
+    entry = client.url_index.get(key)
+
+    # archive names start with "{year}{month}"
+    def month(url: str) -> str:
+        return url.rsplit("/", maxsplit=1)[-1][:6]
+
+    def latest_month() -> Optional[str]:
+        return (
+            month(entry.url)
+            if entry is not None and entry.url is not None
+            else None
+        )
+
+    def daily_url(date: dt.datetime) -> str:
+        return client.urljoin(
+            client.MARKET_REPORTS_URL,
+            client.market_report_filename(date, report, is_archived=False),
+        )
+
+    async def month_state(
+        archive_url: str, dates: list[dt.datetime]
+    ) -> Literal["daily", "archived", "missing"]:
+        nonlocal entry
+        if await client.check_url_exists(daily_url(dates[0])):
+            return "daily"
+        if await client.check_url_exists(archive_url):
+            latest = latest_month()
+            if latest is None or month(archive_url) > latest:
+                client.url_index.set(key, archive_url, permanent=True)
+                entry = client.url_index.get(key)
+            return "archived"
+        # first day may just be missing, check the middle and last day
+        urls_exist = await asyncio.gather(
+            *[
+                client.check_url_exists(daily_url(dates[i]))
+                for i in sorted({len(dates) // 2, len(dates) - 1} - {0})
+            ]
+        )
+        return "daily" if any(urls_exist) else "missing"
+
+    # first month which isn't known to precede the cutoff
+    low = 0
+    latest = latest_month()
+    while (
+        latest is not None
+        and low < len(months)
+        and month(months[low][0]) <= latest
+    ):
+        low += 1
+
+    # months which may not be published yet are never archived
+    published_before = dt.datetime.now(
+        pytz.timezone(client.TIMEZONE)
+    ) - dt.timedelta(days=2)
+    high = low
+    while high < len(months) and months[high][1][0] < published_before:
+        high += 1
+
+    # probe the month after the known cutoff, then binary search
+    probe = low
+    while low < high:
+        # skip months without any data (before the cutoff if an
+        # archived month follows, otherwise after it)
+        state = await month_state(*months[probe])
+        found = probe
+        while state == "missing" and found + 1 < high:
+            found += 1
+            state = await month_state(*months[found])
+        if state == "archived":
+            low = found + 1
+        else:
+            high = probe
+        probe = (low + high) // 2
+
+    client.url_index.save()
+    return low
+
+
+def market_report_key(date: dt.datetime, report: "MISOMarketReport") -> str:
+    return f"{report.name}/{date.date().isoformat()}"
+
+
+def parser_version(
+    client: "MISOClient", parse_fn: Callable[[IO[bytes]], pd.DataFrame]
+) -> str:
+    """
+    Identifies parser logic (and parser options, e.g. "nodes") for
+    "parsed_cache" entries.
+
+    Parser logic is identified by a hash of the parse function's code
+    (see "parser_code_digest"), so changing a parser invalidates its
+    cached reports without bumping "PARSER_VERSION".
+    """
+
+    options = ""
+    if isinstance(parse_fn, functools.partial):
+        # the node catalog only changes node codes, not the data
+        keywords = parse_fn.keywords.items()
+        options_str = repr(
+            (
+                parse_fn.args,
+                sorted(
+                    (key, value)
+                    for key, value in keywords
+                    if key != "node_catalog"
+                ),
+            )
+        )
+        options = "." + hashlib.sha256(options_str.encode()).hexdigest()[:12]
+        parse_fn = parse_fn.func
+
+    name = getattr(parse_fn, "__name__", type(parse_fn).__name__)
+    if (digest := parser_code_digest(parse_fn)) != "":
+        name = f"{name}.{digest}"
+    return f"{name}{options}.v{client.PARSER_VERSION}"
+
+
+def parser_code_digest(parse_fn: Callable[..., Any]) -> str:
+    """
+    Hash of the source of "parse_fn" and the powerviz functions it
+    calls by name (e.g. "powerviz.nodes.encode_nodes"), empty if
+    "parse_fn" isn't a function. Bytecode is hashed instead if the
+    source isn't available.
+    Changes that aren't visible in this code (e.g. client attributes
+    used by the parser) still need a "PARSER_VERSION" bump.
+    """
+
+    # bound classmethods (e.g. "MISOClient.parse_*") hash their function
+    func = inspect.unwrap(getattr(parse_fn, "__func__", parse_fn))
+    if not inspect.isfunction(func):
+        # e.g. callable objects, only identified by name
+        return ""
+
+    def source(func: Callable[..., Any]) -> str:
+        try:
+            return inspect.getsource(func)
+        except (OSError, TypeError):
+            return func.__code__.co_code.hex()
+
+    # global names used by the function and its nested code
+    # (comprehensions, lambdas)
+    names: set[str] = set()
+    codes = [func.__code__]
+    while len(codes) > 0:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(
+            const for const in code.co_consts if inspect.iscode(const)
+        )
+
+    sources = [source(func)]
+    for name in sorted(names):
+        value = func.__globals__.get(name)
+        if (
+            inspect.isfunction(value)
+            and value is not func
+            and value.__module__.startswith("powerviz.")
+        ):
+            sources.append(source(value))
+
+    return hashlib.sha256("\n".join(sources).encode()).hexdigest()[:12]
+
+
+def cached_market_report_dates(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    version: str,
+    finalized_before: dt.datetime,
+) -> list[dt.datetime]:
+    """
+    Finalized dates with parsed reports in "parsed_cache".
+    """
+
+    if client.parsed_cache is None:
+        return []
+
+    return [
+        date
+        for date in dates
+        if date < finalized_before
+        and client.parsed_cache.contains(report.name, date.date(), version)
+    ]
+
+
+async def iter_cached_market_reports(
+    client: "MISOClient",
+    dates: list[dt.datetime],
+    report: "MISOMarketReport",
+    version: str,
+) -> AsyncIterator[tuple[dt.datetime, pd.DataFrame | None]]:
+    """
+    Parsed reports of "dates" from "parsed_cache", one at a time
+    (None if removed from the cache).
+    """
+
+    if client.parsed_cache is None:
+        return
+
+    for date in dates:
+        yield date, await asyncio.to_thread(
+            client.parsed_cache.get, report.name, date.date(), version
+        )
+
+
+async def cache_parsed_market_report(
+    client: "MISOClient",
+    report: "MISOMarketReport",
+    date: dt.datetime,
+    version: str,
+    df: pd.DataFrame,
+) -> None:
+    if client.parsed_cache is None:
+        return
+
+    await asyncio.to_thread(
+        client.parsed_cache.put, report.name, date.date(), version, df
+    )
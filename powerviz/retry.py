@@ -0,0 +1,169 @@
+import asyncio
+import dataclasses
+import datetime as dt
+import email.utils
+import random
+import time
+from typing import Optional
+
+import aiohttp
+import tenacity
+
+from powerviz.limiter import is_overload_error
+from powerviz.types import CircuitOpenError
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:  # pylint: disable=too-many-instance-attributes
+    """
+    Retry configuration for "BaseClient._fetch".
+
+    Waits grow exponentially from "initial_wait" up to "max_wait" with
+    full jitter (random wait between 0 and the exponential wait).
+    If the server sends a "Retry-After" header, it is honored
+    (capped at "max_retry_after").
+
+    Retries draw from a shared budget: every request adds
+    "budget_ratio" tokens (up to "budget_max_tokens") and every retry
+    spends one, so retries are limited to roughly "budget_ratio" of
+    all requests once the initial tokens are used up.
+
+    After "breaker_failure_threshold" consecutive failures to a host,
+    requests to that host fail fast for "breaker_reset_timeout" seconds.
+    """
+
+    max_attempts: int = 6
+    initial_wait: float = 1.0
+    max_wait: float = 60.0
+    max_retry_after: float = 300.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    budget_ratio: float = 0.2
+    budget_max_tokens: float = 20.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    def is_retryable(self, error: BaseException) -> bool:
+        # never retry requests rejected by an open circuit breaker
+        if isinstance(error, CircuitOpenError):
+            return False
+        # don't retry 404 not found, etc.
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in self.retry_statuses
+        return isinstance(error, (aiohttp.ClientConnectionError, TimeoutError))
+
+    def wait(self, retry_state: tenacity.RetryCallState) -> float:
+        if retry_state.outcome is not None:
+            retry_after = parse_retry_after(retry_state.outcome.exception())
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+
+        exp_wait = self.initial_wait * 2 ** (retry_state.attempt_number - 1)
+        return random.uniform(0, min(exp_wait, self.max_wait))
+
+
+def parse_retry_after(error: Optional[BaseException]) -> float | None:
+    """
+    Seconds to wait from the "Retry-After" header of a failed
+    response (given as seconds or HTTP date), if any.
+    """
+
+    if not isinstance(error, aiohttp.ClientResponseError):
+        return None
+    if error.headers is None or "Retry-After" not in error.headers:
+        return None
+
+    retry_after = error.headers["Retry-After"].strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+
+    try:
+        date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=dt.timezone.utc)
+    return max(0.0, (date - dt.datetime.now(dt.timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of all requests.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breaker.
+
+    "closed": requests pass through.
+    "open": requests fail immediately with "CircuitOpenError".
+    "half-open": after "reset_timeout" seconds, a single trial request
+    is let through. Success closes the circuit, failure reopens it.
+    """
+
+    def __init__(
+        self, host: str, failure_threshold: int, reset_timeout: float
+    ) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def check(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_in_flight):
+            raise CircuitOpenError(
+                f'Circuit for host "{self.host}" is open '
+                "(too many consecutive failures)."
+            )
+        if state == "half-open":
+            self._trial_in_flight = True
+
+    def record(self, error: Optional[BaseException]) -> None:
+        self._trial_in_flight = False
+
+        # cancelled requests say nothing about host health
+        if isinstance(error, asyncio.CancelledError):
+            return
+
+        # only errors pointing to an unhealthy host count as failures
+        # (e.g. 404 not found is a healthy response)
+        if error is not None and (
+            is_overload_error(error)
+            or isinstance(error, aiohttp.ClientConnectionError)
+        ):
+            self.failures += 1
+            if (
+                self.failures >= self.failure_threshold
+                or self.opened_at is not None
+            ):
+                self.opened_at = time.monotonic()
+            return
+
+        self.failures = 0
+        self.opened_at = None
@@ -0,0 +1,356 @@
+import collections
+import dataclasses
+import time
+import types
+from typing import Optional
+
+import aiohttp
+import pandas as pd
+
+PHASES = ("queued", "pool", "dns", "connect", "ttfb", "download")
+
+# per endpoint sums kept for traces dropped by "RequestTracer"
+TOTALS = ("requests", "errors", "retries", "bytes", *PHASES, "total")
+
+
+@dataclasses.dataclass
+class RequestTrace:  # pylint: disable=too-many-instance-attributes
+    """
+    Timings (seconds) of a single "BaseClient._fetch" call.
+    Phase timings are summed over all attempts (retries).
+
+    queued: waiting on the client's concurrency limiter
+    pool: waiting for a free connection in the connector pool
+    dns: resolving the host
+    connect: creating the connection (including TLS handshake)
+    ttfb: request start until response headers received
+        (includes pool, dns and connect)
+    download: response headers until last body chunk received
+    """
+
+    endpoint: str
+    url: str
+    method: str
+    attempts: int = 0
+    status: Optional[int] = None
+    error: Optional[str] = None
+    bytes: int = 0
+    queued: float = 0.0
+    pool: float = 0.0
+    dns: float = 0.0
+    connect: float = 0.0
+    ttfb: float = 0.0
+    download: float = 0.0
+    # time the response headers or last body chunk were received
+    last_chunk: float = dataclasses.field(
+        default=0.0, repr=False, compare=False
+    )
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def total(self) -> float:
+        # pool, dns and connect are part of ttfb
+        return self.queued + self.ttfb + self.download
+
+    def chunk_received(self, size: int) -> None:
+        """
+        Count a received body chunk (streamed responses are counted by
+        the reader, see "BaseClient._fetch_file").
+        """
+
+        now = time.monotonic()
+        self.bytes += size
+        self.download += now - self.last_chunk
+        self.last_chunk = now
+
+
+class RequestTracer:
+    """
+    Opt-in per request network tracing built on aiohttp's "TraceConfig".
+
+    The client's session must be created with "trace_config"
+    (done automatically if the client creates its own session).
+    Traces are aggregated per endpoint (e.g. api message type or
+    market report type, see "BaseClient.endpoint").
+
+    Only the latest "max_traces" traces are kept (e.g. for long running
+    pollers), older traces are only counted in the per endpoint totals
+    of "totals" and "to_prometheus".
+    """
+
+    def __init__(self, max_traces: int = 10_000) -> None:
+        self.traces: collections.deque[RequestTrace] = collections.deque(
+            maxlen=max_traces
+        )
+        self._dropped: dict[str, dict[str, float]] = {}
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_request_exception.append(
+            self._on_request_exception
+        )
+        self.trace_config.on_connection_queued_start.append(
+            self._on_connection_queued_start
+        )
+        self.trace_config.on_connection_queued_end.append(
+            self._on_connection_queued_end
+        )
+        self.trace_config.on_dns_resolvehost_start.append(
+            self._on_dns_resolvehost_start
+        )
+        self.trace_config.on_dns_resolvehost_end.append(
+            self._on_dns_resolvehost_end
+        )
+        self.trace_config.on_connection_create_start.append(
+            self._on_connection_create_start
+        )
+        self.trace_config.on_connection_create_end.append(
+            self._on_connection_create_end
+        )
+        self.trace_config.on_response_chunk_received.append(
+            self._on_response_chunk_received
+        )
+
+    def start(self, endpoint: str, url: str, method: str) -> RequestTrace:
+        trace = RequestTrace(endpoint=endpoint, url=url, method=method)
+        if len(self.traces) == self.traces.maxlen:
+            self._drop(self.traces[0])
+        self.traces.append(trace)
+        return trace
+
+    def clear(self) -> None:
+        self.traces.clear()
+        self._dropped.clear()
+
+    def _drop(self, trace: RequestTrace) -> None:
+        totals = self._dropped.setdefault(
+            trace.endpoint, dict.fromkeys(TOTALS, 0.0)
+        )
+        totals["requests"] += 1
+        totals["errors"] += trace.error is not None
+        totals["retries"] += trace.retries
+        totals["bytes"] += trace.bytes
+        for phase in PHASES:
+            totals[phase] += getattr(trace, phase)
+        totals["total"] += trace.total
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [
+                {
+                    "endpoint": trace.endpoint,
+                    "url": trace.url,
+                    "method": trace.method,
+                    "status": trace.status,
+                    "error": trace.error,
+                    "retries": trace.retries,
+                    "bytes": trace.bytes,
+                    **{phase: getattr(trace, phase) for phase in PHASES},
+                    "total": trace.total,
+                }
+                for trace in self.traces
+            ],
+            columns=[
+                "endpoint",
+                "url",
+                "method",
+                "status",
+                "error",
+                "retries",
+                "bytes",
+                *PHASES,
+                "total",
+            ],
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per endpoint request counts, errors, retries, bytes, mean phase
+        timings and total latency percentiles (seconds) of the kept
+        traces.
+        """
+
+        df = self.to_dataframe()
+        grouped = df.groupby("endpoint", sort=True)
+
+        summary_df = pd.DataFrame(
+            {
+                "requests": grouped.size(),
+                "errors": grouped["error"].count(),
+                "retries": grouped["retries"].sum(),
+                "bytes": grouped["bytes"].sum(),
+                **{phase: grouped[phase].mean() for phase in PHASES},
+                "p50": grouped["total"].quantile(0.5),
+                "p95": grouped["total"].quantile(0.95),
+                "max": grouped["total"].max(),
+            }
+        )
+        return summary_df
+
+    def totals(self) -> pd.DataFrame:
+        """
+        Per endpoint request counts, errors, retries, bytes and summed
+        phase timings of all traces (including dropped traces).
+        """
+
+        df = self.to_dataframe()
+        df["requests"] = 1
+        df["errors"] = df["error"].notna().astype(int)
+        totals_df = (
+            df.groupby("endpoint", sort=True)[list(TOTALS)]
+            .sum()
+            .add(
+                pd.DataFrame.from_dict(
+                    self._dropped, orient="index", columns=list(TOTALS)
+                ),
+                fill_value=0,
+            )
+            .sort_index()
+        )
+        counts = ["requests", "errors", "retries", "bytes"]
+        totals_df[counts] = totals_df[counts].astype(int)
+        return totals_df
+
+    def to_prometheus(self, prefix: str = "powerviz") -> str:
+        """
+        Aggregated traces (see "totals") in Prometheus text exposition
+        format.
+        """
+
+        totals_df = self.totals()
+
+        lines: list[str] = []
+
+        def add_metric(name: str, kind: str, help_str: str) -> str:
+            metric = f"{prefix}_{name}"
+            lines.append(f"# HELP {metric} {help_str}")
+            lines.append(f"# TYPE {metric} {kind}")
+            return metric
+
+        counters = (
+            ("requests_total", "Requests made.", "requests"),
+            ("request_errors_total", "Failed requests.", "errors"),
+            ("request_retries_total", "Retried attempts.", "retries"),
+            ("response_bytes_total", "Response body bytes.", "bytes"),
+        )
+        for name, help_str, col in counters:
+            metric = add_metric(name, "counter", help_str)
+            for endpoint, value in totals_df[col].items():
+                lines.append(f'{metric}{{endpoint="{endpoint}"}} {value}')
+
+        metric = add_metric(
+            "request_phase_seconds", "summary", "Time spent per request phase."
+        )
+        for endpoint, row in totals_df.iterrows():
+            for phase in (*PHASES, "total"):
+                labels = f'endpoint="{endpoint}",phase="{phase}"'
+                lines.append(f"{metric}_sum{{{labels}}} {row[phase]}")
+                lines.append(
+                    f"{metric}_count{{{labels}}} {row['requests']:.0f}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _trace(ctx: types.SimpleNamespace) -> RequestTrace | None:
+        trace = ctx.trace_request_ctx
+        return trace if isinstance(trace, RequestTrace) else None
+
+    async def _on_request_start(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceRequestStartParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.error = None
+            ctx.start = time.monotonic()
+
+    async def _on_request_end(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        params: aiohttp.TraceRequestEndParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.last_chunk = time.monotonic()
+            trace.ttfb += trace.last_chunk - ctx.start
+            trace.status = params.response.status
+
+    async def _on_request_exception(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        params: aiohttp.TraceRequestExceptionParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.ttfb += time.monotonic() - ctx.start
+            trace.error = type(params.exception).__name__
+            if isinstance(params.exception, aiohttp.ClientResponseError):
+                trace.status = params.exception.status
+
+    async def _on_connection_queued_start(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceConnectionQueuedStartParams,
+    ) -> None:
+        ctx.pool_start = time.monotonic()
+
+    async def _on_connection_queued_end(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceConnectionQueuedEndParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.pool += time.monotonic() - ctx.pool_start
+
+    async def _on_dns_resolvehost_start(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceDnsResolveHostStartParams,
+    ) -> None:
+        ctx.dns_start = time.monotonic()
+
+    async def _on_dns_resolvehost_end(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceDnsResolveHostEndParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.dns += time.monotonic() - ctx.dns_start
+
+    async def _on_connection_create_start(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceConnectionCreateStartParams,
+    ) -> None:
+        ctx.connect_start = time.monotonic()
+
+    async def _on_connection_create_end(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        _params: aiohttp.TraceConnectionCreateEndParams,
+    ) -> None:
+        if (trace := self._trace(ctx)) is not None:
+            trace.connect += time.monotonic() - ctx.connect_start
+
+    async def _on_response_chunk_received(
+        self,
+        _session: aiohttp.ClientSession,
+        ctx: types.SimpleNamespace,
+        params: aiohttp.TraceResponseChunkReceivedParams,
+    ) -> None:
+        # only sent by "ClientResponse.read", streamed bodies are counted
+        # by the reader
+        if (trace := self._trace(ctx)) is not None:
+            trace.chunk_received(len(params.chunk))
@@ -1,8 +1,31 @@
+import enum
+import re
 from datetime import datetime
-from typing import Literal, TypeAlias
+from typing import Literal, Sequence, TypeAlias
 
 Dates: TypeAlias = list[datetime] | Literal["latest", "today"]
 
+# LMP node selection: trading hubs only, all nodes, a list of node
+# names or a regex pattern (matched anywhere in node names)
+Nodes: TypeAlias = Literal["hubs", "all"] | Sequence[str] | re.Pattern[str]
+
+# historical datasets, see "MISOClient.iter_report_days"
+Dataset: TypeAlias = Literal[
+    "load", "forecast", "fuel_mix", "realtime_lmp", "dayahead_lmp"
+]
+
+
+class NoNewData(enum.Enum):
+    """
+    Result of polling an endpoint which hasn't published new data
+    since the last poll.
+    """
+
+    NO_NEW_DATA = "No new data."
+
+
+NO_NEW_DATA = NoNewData.NO_NEW_DATA
+
 
 class DatesTypeError(TypeError):
     def __init__(
@@ -21,3 +44,22 @@ class FileTypeError(TypeError):
         message: str = "Unrecognized filetype.",
     ) -> None:
         super().__init__(message)
+
+
+class NodesTypeError(TypeError):
+    def __init__(
+        self,
+        message: str = (
+            'Invalid "nodes" input. "nodes" must be "hubs", "all", '
+            "a list of node names, or a compiled regex pattern."
+        ),
+    ) -> None:
+        super().__init__(message)
+
+
+class CircuitOpenError(ConnectionError):
+    def __init__(
+        self,
+        message: str = "Circuit is open (host is unhealthy).",
+    ) -> None:
+        super().__init__(message)
@@ -5,7 +5,9 @@ import psycopg2
 import psycopg2.extras
 from dotenv import load_dotenv
 
+from powerviz.cache import ChangeTracker
 from powerviz.miso import MISOClient
+from powerviz.types import NO_NEW_DATA
 
 
 def get_table_columns(  # pylint: disable=duplicate-code
@@ -29,13 +31,10 @@ async def update_miso_db(
 ) -> None:
 
     miso_tables_data_getters = {  # key=table name val=data method and args
-        "miso_load_api": (client.get_load_data, ("today",)),
-        "miso_forecast_api": (client.get_forecast_data, ("today",)),
-        "miso_fuelmix_api": (client.get_fuel_mix_data, ("latest",)),
-        "miso_realtime_expost_lmp_api": (
-            client.get_realtime_lmp_data,
-            ("today",),
-        ),
+        "miso_load_api": (client.poll_load_data, ()),
+        "miso_forecast_api": (client.poll_forecast_data, ()),
+        "miso_fuelmix_api": (client.poll_fuel_mix_data, ()),
+        "miso_realtime_expost_lmp_api": (client.poll_realtime_lmp_data, ()),
         "miso_dayahead_exante_lmp_market_report": (
             client.get_dayahead_lmp_data,
             ("today",),
@@ -55,6 +54,9 @@ async def update_miso_db(
     )
 
     for tbl, df in miso_data.items():
+        # skip endpoints without new intervals since last update
+        if df is NO_NEW_DATA:
+            continue
 
         table_cols = get_table_columns(tbl, conn)
         matching_cols = [col for col in table_cols if col in df.columns]
@@ -70,6 +72,9 @@ async def update_miso_db(
                 )
                 psycopg2.extras.execute_values(cursor, sql, data)
 
+    # only mark polled data as seen once inserted
+    client.change_tracker.save()
+
 
 async def main() -> None:
     load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
@@ -80,8 +85,12 @@ async def main() -> None:
         host=os.environ["POSTGRES_HOST"],
     )
 
-    client = MISOClient()
-    await update_miso_db(conn, client)
+    async with MISOClient(
+        change_tracker=ChangeTracker(
+            os.path.join(os.path.dirname(__file__), "../.miso_changes.json")
+        )
+    ) as client:
+        await update_miso_db(conn, client)
 
 
 if __name__ == "__main__":